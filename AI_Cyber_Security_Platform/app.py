@@ -1,8 +1,10 @@
 from flask import Flask, render_template, request, jsonify, redirect, url_for
 from flask import send_file
-from services.spam_service import predict_spam
-from services.phishing_url_service import predict_phishing_url
-from services.phishing_website_service import predict_phishing_website
+from services.spam_service import predict_spam, predict_spam_batch
+from services.phishing_url_service import predict_phishing_url, predict_phishing_url_batch
+from services import phishing_url_service
+from services import phishing_website_service
+from services import model_registry
 from services import history
 from services import auth
 from services import ensemble
@@ -35,6 +37,8 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 # BASE: use repository working directory for any file writes so paths are Linux-friendly
 BASE = os.getcwd()
+# pick up replaced model files without a restart (MODEL_WATCH_INTERVAL=0 disables)
+model_registry.start_watcher()
 
 @app.route('/')
 def home():
@@ -213,11 +217,32 @@ def spam_api():
         history.save_prediction('spam', text, str(result))
     return jsonify(result)
 
+# upper bound on texts accepted by one /api/spam/batch request
+MAX_SPAM_BATCH = int(os.environ.get('MAX_SPAM_BATCH', 1000))
+
+@app.route('/api/spam/batch', methods=['POST'])
+def spam_batch_api():
+    data = request.get_json() or {}
+    texts = data.get('texts')
+    if not isinstance(texts, list):
+        return jsonify({'error': "'texts' must be a list"}), 400
+    if len(texts) > MAX_SPAM_BATCH:
+        return jsonify({'error': f'At most {MAX_SPAM_BATCH} texts per request'}), 400
+    results = predict_spam_batch(texts)
+    import json as _json
+    history.save_predictions([('spam', result['raw'], _json.dumps(result)) for result in results])
+    return jsonify({'results': results})
+
 @app.route('/api/phishing-url', methods=['POST'])
 def phishing_url_api():
     data = request.get_json() or {}
     url = data.get('url', '')
-    result = predict_phishing_url(url)
+    # optional extraction tier: 'lexical' (no network), 'standard' or 'full' (default)
+    tier = data.get('tier', 'full')
+    try:
+        result = predict_phishing_url(url, tier=tier)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     # store stringified result in history
     try:
         import json as _json
@@ -226,13 +251,39 @@ def phishing_url_api():
         history.save_prediction('phishing_url', url, str(result))
     return jsonify(result)
 
+# upper bound on URLs accepted by one /api/phishing-url/batch request
+MAX_URL_BATCH = int(os.environ.get('MAX_URL_BATCH', 1000))
+# full-tier URLs are all probed over the network, so fewer fit in one request
+MAX_FULL_URL_BATCH = int(os.environ.get('MAX_FULL_URL_BATCH', 100))
+
+@app.route('/api/phishing-url/batch', methods=['POST'])
+def phishing_url_batch_api():
+    data = request.get_json() or {}
+    urls = data.get('urls')
+    tier = data.get('tier', 'full')
+    if not isinstance(urls, list):
+        return jsonify({'error': "'urls' must be a list"}), 400
+    if len(urls) > MAX_URL_BATCH:
+        return jsonify({'error': f'At most {MAX_URL_BATCH} URLs per request'}), 400
+    if tier == 'full' and len(urls) > MAX_FULL_URL_BATCH:
+        return jsonify({'error': f"At most {MAX_FULL_URL_BATCH} URLs per 'full' tier request; "
+                                 f"use tier 'standard' or 'lexical' for larger batches"}), 400
+    try:
+        results = predict_phishing_url_batch(urls, tier=tier)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    import json as _json
+    history.save_predictions([('phishing_url', str(url), _json.dumps(result))
+                              for url, result in zip(urls, results)])
+    return jsonify({'results': results})
+
 @app.route('/api/phishing-website', methods=['POST'])
 def phishing_website_api():
     data = request.get_json() or {}
     features = data.get('features')
-    result = predict_phishing_website(features)
+    result, version = phishing_website_service.predict_phishing_website_with_version(features)
     history.save_prediction('phishing_website', str(features), result)
-    return jsonify({'result': result})
+    return jsonify({'result': result, 'model_version': version})
 
 
 @app.route('/dashboard')
@@ -252,7 +303,11 @@ def dashboard():
 def ensemble_api():
     data = request.get_json() or {}
     url = data.get('url', '')
-    res = ensemble.ensemble_predict(url)
+    mode = data.get('mode') or request.args.get('mode')
+    try:
+        res = ensemble.ensemble_predict(url, mode=mode)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     history.save_prediction('ensemble', url, res.get('combined'))
     return jsonify(res)
 
@@ -286,6 +341,48 @@ def _require_login(func):
     return wrapper
 
 
+def _require_admin(func):
+    # admin API calls must send the ADMIN_TOKEN environment value in X-Admin-Token;
+    # without ADMIN_TOKEN configured the admin API is disabled
+    from functools import wraps
+    @wraps(func)
+    def wrapper(*a, **kw):
+        token = os.environ.get('ADMIN_TOKEN')
+        if not token or request.headers.get('X-Admin-Token') != token:
+            return jsonify({'error': 'forbidden'}), 403
+        return func(*a, **kw)
+    return wrapper
+
+
+@app.route('/admin/url-verdict-cache', methods=['GET', 'DELETE'])
+@_require_admin
+def url_verdict_cache_admin():
+    # GET: hit/miss counters; DELETE: invalidate all verdicts, or one URL via ?url=
+    if request.method == 'DELETE':
+        removed = phishing_url_service.invalidate_verdicts(request.args.get('url'))
+        return jsonify({'invalidated': removed})
+    return jsonify(phishing_url_service.verdict_cache_stats())
+
+
+@app.route('/admin/models', methods=['GET'])
+@_require_admin
+def models_admin():
+    return jsonify({'models': model_registry.all_status()})
+
+
+@app.route('/admin/models/<name>/reload', methods=['POST'])
+@_require_admin
+def model_reload_admin(name):
+    # loads in the background unless ?wait=1; requests keep using the old model meanwhile
+    try:
+        registry = model_registry.get(name)
+    except KeyError:
+        return jsonify({'error': f'Unknown model: {name}'}), 404
+    wait = request.args.get('wait') in ('1', 'true')
+    registry.reload(wait=wait)
+    return jsonify(registry.status()), (200 if wait else 202)
+
+
 @app.route('/history')
 def history_page():
     # history is public now (login removed)
@@ -0,0 +1,206 @@
+"""Process-wide pooled HTTP client for the network probes.
+
+The URL feature probes, the website feature extractor and the QR redirect
+follower all go through ``get``/``head`` here instead of bare ``requests``
+calls, so repeated scans of the same hosts reuse keep-alive connections and
+TLS sessions. Settings (environment variables):
+
+  HTTP_CONNECT_TIMEOUT   connect timeout in seconds (default 3)
+  HTTP_READ_TIMEOUT      read timeout in seconds (default 10)
+  HTTP_POOL_HOSTS        number of per-host pools kept alive (default 100)
+  HTTP_POOL_PER_HOST     max concurrent connections to one host (default 4)
+  HTTP_POOL_TIMEOUT      seconds to wait for a free connection to a busy host (default 10)
+  HTTP_DNS_TTL           seconds a DNS answer is reused, 0 disables (default 300)
+  HTTP_DRAIN_LIMIT       largest unread body (bytes) drained to keep a connection (default 65536)
+
+The DNS cache only applies to connections opened by these sessions; the rest
+of the process (WHOIS, SMTP, ...) resolves names as usual.
+"""
+import os
+import socket
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, EmptyPoolError, NameResolutionError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+
+CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 3))
+READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 10))
+POOL_HOSTS = int(os.environ.get('HTTP_POOL_HOSTS', 100))
+POOL_PER_HOST = int(os.environ.get('HTTP_POOL_PER_HOST', 4))
+POOL_TIMEOUT = float(os.environ.get('HTTP_POOL_TIMEOUT', 10))
+DNS_TTL = float(os.environ.get('HTTP_DNS_TTL', 300))
+DRAIN_LIMIT = int(os.environ.get('HTTP_DRAIN_LIMIT', 65536))
+
+DEFAULT_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+
+class DNSCache:
+    """TTL cache in front of ``socket.getaddrinfo`` (successful answers only)."""
+
+    def __init__(self, ttl=DNS_TTL, maxsize=10000, resolver=None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._resolve = resolver or socket.getaddrinfo
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        key = (host, port, family, type, proto, flags)
+        now = time.monotonic()
+        with self._lock:
+            hit = self._entries.get(key)
+        if hit is not None and hit[0] > now:
+            return list(hit[1])
+        answer = self._resolve(host, port, family, type, proto, flags)
+        with self._lock:
+            if len(self._entries) >= self.maxsize:
+                self._entries.clear()
+            self._entries[key] = (now + self.ttl, answer)
+        return list(answer)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+DNS_CACHE = DNSCache()
+_lock = threading.Lock()
+_adapter = None
+_sessions = {}
+_pid = None
+
+
+class _CachedDNSConnection:
+    """Connection mixin resolving the host through DNS_CACHE.
+
+    Each cached address is tried in turn by connecting to it directly; the
+    hostname is still used for the Host header, SNI and certificate checks.
+    """
+
+    def _new_conn(self):
+        if DNS_TTL <= 0:
+            return super()._new_conn()
+        host = self._dns_host
+        try:
+            addresses = DNS_CACHE.getaddrinfo(host.strip('[]'), self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        error = None
+        for *_, sockaddr in addresses:
+            self._dns_host = sockaddr[0]
+            try:
+                return super()._new_conn()
+            except (ConnectTimeoutError, NewConnectionError) as e:
+                error = e
+            finally:
+                self._dns_host = host
+        if error is None:
+            raise NewConnectionError(self, f'Failed to establish a new connection: no address for {host}')
+        raise error
+
+
+class _HTTPConnection(_CachedDNSConnection, HTTPConnection):
+    pass
+
+
+class _HTTPSConnection(_CachedDNSConnection, HTTPSConnection):
+    pass
+
+
+class _PoolTimeout:
+    """Pool mixin: wait at most POOL_TIMEOUT for a free connection."""
+
+    def _get_conn(self, timeout=None):
+        return super()._get_conn(timeout=POOL_TIMEOUT if timeout is None else timeout)
+
+
+class _HTTPPool(_PoolTimeout, HTTPConnectionPool):
+    ConnectionCls = _HTTPConnection
+
+
+class _HTTPSPool(_PoolTimeout, HTTPSConnectionPool):
+    ConnectionCls = _HTTPSConnection
+
+
+class _Adapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': _HTTPPool, 'https': _HTTPSPool}
+
+
+def get_session(max_redirects=None):
+    """Return the shared session (one per ``max_redirects`` value).
+
+    All sessions mount the same adapter, so they share connection pools.
+    Cookies are never stored: scanned sites must not see each other's state.
+    Sessions are rebuilt after a fork so processes never share sockets.
+    """
+    global _adapter, _pid
+    max_redirects = requests.models.DEFAULT_REDIRECT_LIMIT if max_redirects is None else max_redirects
+    with _lock:
+        if _pid != os.getpid():
+            _adapter = None
+            _sessions.clear()
+            _pid = os.getpid()
+        session = _sessions.get(max_redirects)
+        if session is not None:
+            return session
+        if _adapter is None:
+            # pool_block caps concurrent connections per host at POOL_PER_HOST;
+            # a request waiting longer than POOL_TIMEOUT for one fails
+            _adapter = _Adapter(pool_connections=POOL_HOSTS,
+                                pool_maxsize=POOL_PER_HOST,
+                                pool_block=True)
+        session = requests.Session()
+        session.max_redirects = max_redirects
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        session.mount('http://', _adapter)
+        session.mount('https://', _adapter)
+        _sessions[max_redirects] = session
+        return session
+
+
+def request(method, url, timeout=None, max_redirects=None, **kwargs):
+    """Send a request through the shared pools (timeout defaults to DEFAULT_TIMEOUT)."""
+    session = get_session(max_redirects)
+    try:
+        return session.request(method, url, timeout=timeout or DEFAULT_TIMEOUT, **kwargs)
+    except EmptyPoolError as e:
+        # every connection to the host stayed busy for POOL_TIMEOUT seconds
+        raise requests.exceptions.ConnectionError(e) from e
+
+
+def get(url, **kwargs):
+    kwargs.setdefault('allow_redirects', True)
+    return request('GET', url, **kwargs)
+
+
+def head(url, **kwargs):
+    kwargs.setdefault('allow_redirects', False)
+    return request('HEAD', url, **kwargs)
+
+
+def discard(response):
+    """Release a streamed response (stream=True) without reading a large body.
+
+    A body of known length up to DRAIN_LIMIT is drained so the connection goes
+    back to the pool; otherwise the connection is closed.
+    """
+    try:
+        length = int(response.headers.get('Content-Length', ''))
+    except ValueError:
+        length = None
+    try:
+        if length is not None and length <= DRAIN_LIMIT:
+            response.raw.drain_conn()
+            response.raw.release_conn()
+            return
+    except Exception:
+        pass
+    response.close()
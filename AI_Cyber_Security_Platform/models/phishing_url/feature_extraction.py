@@ -4,505 +4,39 @@ import ipaddress
 import posixpath
 import os
 import csv
+import inspect
+import json
+import sqlite3
+import string
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, wait
+import numpy as np
 from datetime import datetime
 import requests
 from urllib.parse import urlparse, parse_qs
 import whois
+try:
+    from tld import get_fld
+except Exception:
+    get_fld = None
 from datetime import datetime
 import requests
-
-def attributes():
-    """Output file attributes."""
-    lexical = [
-    'dot_url', 'hyphe_url', 'underline_url', 'bar_url', 'question_url',
-    'equal_url', 'arroba_url', 'ampersand_url', 'exclamation_url',
-    'blank_url', 'til_url', 'comma_url', 'plus_url', 'asterisk_url', 'hashtag_url',
-    'money_sign_url', 'percentage_url', 'count_tld_url', 'len_url', 'alpha_url', 'timeresponse_url',
-    'time_domain_activation_url', 'time_domain_expiration_url', 'Hasshortner_URL',
-    'dot_host','hyphe_host', 'underline_host', 'bar_host', 'question_host', 'equal_host',
-    'arroba_host', 'ampersand_host', 'exclamation_host', 'blank_host', 'til_host',
-    'comma_host', 'plus_host', 'asterisk_host', 'hashtag_host', 'money_sign_host',
-    'percentage_host', 'vowels_host', 'len_host', 'ip_exist', 'server_client',
-    'dot_path', 'hyphe_path', 'underline_path', 'bar_path', 'question_path',
-    'equal_path', 'arroba_path', 'ampersand_path', 'exclamation_path',
-    'blank_path', 'til_path', 'comma_path', 'plus_path', 'asterisk_path',
-    'hashtag_path', 'money_sign_path', 'percentage_path', 'len_path', 'dot_file',
-    'hyphe_file', 'underline_file', 'bar_file', 'question_file', 'equal_file',
-    'arroba_file', 'ampersand_file', 'exclamation_file', 'blank_file',
-    'til_file', 'comma_file', 'plus_file', 'asterisk_file', 'hashtag_file',
-    'money_sign_file', 'percentage_file', 'len_file', 'dot_params',
-    'hyphe_params', 'underline_params', 'bar_params', 'question_params',
-    'equal_params', 'arroba_params', 'ampersand_params', 'exclamation_params',
-    'blank_params', 'til_params', 'comma_params', 'plus_params', 'asterisk_params',
-    'hashtag_params', 'money_sign_params', 'percentage_params', 'len_params',
-    'tld_params', 'number_params', 'email_exist', 'extension'
-        ]
-
-
-    list_attributes = []
-    list_attributes.extend(lexical)
-
-    return list_attributes
-
-
-
-
-shortening_services = (
-    r"bit\.ly|goo\.gl|shorte\.st|go2l\.ink|x\.co|ow\.ly|t\.co|tinyurl|tr\.im|is\.gd|cli\.gs|"
-    r"yfrog\.com|migre\.me|ff\.im|tiny\.cc|url4\.eu|twit\.ac|su\.pr|twurl\.nl|snipurl\.com|"
-    r"short\.to|BudURL\.com|ping\.fm|post\.ly|Just\.as|bkite\.com|snipr\.com|fic\.kr|loopt\.us|"
-    r"doiop\.com|short\.ie|kl\.am|wp\.me|rubyurl\.com|om\.ly|to\.ly|bit\.do|t\.co|lnkd\.in|db\.tt|"
-    r"qr\.ae|adf\.ly|goo\.gl|bitly\.com|cur\.lv|tinyurl\.com|ow\.ly|bit\.ly|ity\.im|q\.gs|is\.gd|"
-    r"po\.st|bc\.vc|twitthis\.com|u\.to|j\.mp|buzurl\.com|cutt\.us|u\.bb|yourls\.org|x\.co|"
-    r"prettylinkpro\.com|scrnch\.me|filoops\.info|vzturl\.com|qr\.net|1url\.com|tweez\.me|v\.gd|"
-    r"tr\.im|link\.zip\.net|"
-    r"0rz\.tw|1-url\.net|126\.am|1tk\.us|1un\.fr|1url\.com|1url\.cz|1wb2\.net|2\.gp|2\.ht|"
-    r"2ad\.in|2doc\.net|2fear\.com|2tu\.us|2ty\.in|2u\.xf\.cz|3ra\.be|3x\.si|4i\.ae|4ks\.net|"
-    r"4view\.me|5em\.cz|5url\.net|5z8\.info|6fr\.ru|6g6\.eu|7\.ly|76\.gd|77\.ai|7fth\.cc|"
-    r"7li\.in|7vd\.cn|8u\.cz|944\.la|98\.to|L9\.fr|Lvvk\.com|To8\.cc|a0\.fr|abbr\.sk|ad-med\.cz|"
-    r"ad5\.eu|ad7\.biz|adb\.ug|adf\.ly|adfa\.st|adfly\.fr|adli\.pw|adv\.li|ajn\.me|aka\.gr|"
-    r"alil\.in|amzn\.to|any\.gs|aqva\.pl|ares\.tl|asso\.in|au\.ms|ayt\.fr|azali\.fr|b00\.fr|"
-    r"b23\.ru|b54\.in|baid\.us|bc\.vc|beam\.to|bee4\.biz|bim\.im|bit\.do|bit\.ly|bitly\.com|"
-    r"bitw\.in|blap\.net|ble\.pl|blip\.tv|boi\.re|bote\.me|bougn\.at|br4\.in|brk\.to|brzu\.net|"
-    r"bul\.lu|bxl\.me|bzh\.me|cachor\.ro|captur\.in|cashfly\.com|cbs\.so|cbug\.cc|cc\.cc|ccj\.im|"
-    r"cf\.ly|cf2\.me|cf6\.co|chilp\.it|cjb\.net|cli\.gs|clikk\.in|clk\.im|cn86\.org|couic\.fr|"
-    r"cr\.tl|cudder\.it|cur\.lv|curl\.im|curte\.me|cut\.pe|cut\.sk|cutt\.eu|cutt\.us|cutu\.me|"
-    r"cybr\.fr|cyonix\.to|d75\.eu|daa\.pl|dai\.ly|decenturl\.com\.br|dd\.ma|ddp\.net|dft\.ba|"
-    r"digbig\.com|doiop\.com|dolp\.cc|dopice\.sk|droid\.ws|dv\.gd|dyo\.gs|e37\.eu|easyurl\.net|"
-    r"ecra\.se|ely\.re|encurtador\.com\.br|erax\.cz|erw\.cz|esy\.es|ex9\.co|ezurl\.cc|fff\.re|"
-    r"fff\.to|fff\.wf|filz\.fr|fnk\.es|foe\.hn|folu\.me|freze\.it|fur\.ly|fwdurl\.net|g00\.me|"
-    r"gca\.sh|gg\.gg|goo\.gl|goo\.lu|grem\.io|guiama\.is|hadej\.co|hide\.my|hjkl\.fr|hops\.me|"
-    r"href\.li|ht\.ly|i-2\.co|i99\.cz|icit\.fr|ick\.li|icks\.ro|iiiii\.in|iky\.fr|ilix\.in|"
-    r"info\.ms|is\.gd|isra\.li|itm\.im|ity\.im|ix\.sk|j\.gs|j\.mp|jdem\.cz|jieb\.be|jp22\.net|"
-    r"jqw\.de|kask\.us|kd2\.org|kfd\.pl|korta\.nu|kr3w\.de|krat\.si|kratsi\.cz|krod\.cz|kuc\.cz|"
-    r"kxb\.me|l-k\.be|lc-s\.co|lc\.cx|lcut\.in|letop10\.|libero\.it|lick\.my|lien\.li|lien\.pl|"
-    r"lin\.io|linkn\.co|linkbucks\.com|llu\.ch|lnk\.co|lnk\.ly|lnk\.sk|lnks\.fr|lnky\.fr|lnp\.sn|"
-    r"lp25\.fr|m1p\.fr|m3mi\.com|make\.my|mcaf\.ee|mdl29\.net|mic\.fr|migre\.me|minu\.me|moour"
-)
-
-
-def start_url(url):
-    """Split URL into: protocol, host, path, params, query and fragment."""
-    if not urlparse(url.strip()).scheme:
-        url = 'http://' + url
-    parsed_url = urlparse(url.strip())
-
-    result = {
-        'url': url,
-        'protocol': parsed_url.scheme,
-        'host': parsed_url.netloc,
-        'path': parsed_url.path,
-        'params': parsed_url.params,
-        'query': parsed_url.query,
-        'fragment': parsed_url.fragment
-    }
-    return result
-
-
-def EnglishLetterCount(str):
-    count = 0
-    engletter = set("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ")
-    for num in str:
-        if num in engletter:
-            count = count + 1
-
-    return count
-
-def count(text, character):
-    """Return the amount of certain character in the text."""
-    return text.count(character)
-
-def count_vowels(text):
-    """Return the number of vowels."""
-    vowels = ['a', 'e', 'i', 'o', 'u']
-    count = 0
-    for i in vowels:
-        count += text.lower().count(i)
-    return count
-
-def length(text):
-    """Return the length of a string."""
-    return len(text)
-
-def valid_ip(host):
-    """Return if the domain has a valid IP format (IPv4 or IPv6)."""
-    try:
-        ipaddress.ip_address(host)
-        return True
-    except Exception:
-        return False
-
-
-def valid_email(text):
-    """Return if there is an email in the text."""
-    if re.findall(r'[\w\.-]+@[\w\.-]+', text):
-        return True
-    else:
-        return False
-
-def read_file(archive):
-    """Read the file with the URLs."""
-    with open(archive, 'r') as f:
-        urls = ([line.rstrip() for line in f])
-        return urls
-
-def check_word_server_client(text):
-    """Return whether the "server" or "client" keywords exist in the domain."""
-    if "server" in text.lower() or "client" in text.lower():
-        return True
-    return False
-
-def count_tld(text):
-    """Return amount of Top-Level Domains (TLD) present in the URL."""
-    file_path = './files/tlds.txt'
-    file = open(file_path, 'r')
-    count = 0
-    pattern = re.compile("[a-zA-Z0-9.]")
-    for line in file:
-        i = (text.lower().strip()).find(line.strip())
-        while i > -1:
-            if ((i + len(line) - 1) >= len(text)) or not pattern.match(text[i + len(line) - 1]):
-                count += 1
-            i = text.find(line.strip(), i + 1)
-    file.close()
-    return count
-
-def extract_extension(text):
-    """Return file extension name."""
-    file_path = './files/extensions.txt'
-    file = open(file_path, 'r')
-
-    pattern = re.compile("[a-zA-Z0-9.]")
-    for extension in file:
-        i = (text.lower().strip()).find(extension.strip())
-        while i > -1:
-            if ((i + len(extension) - 1) >= len(text)) or not pattern.match(text[i + len(extension) - 1]):
-                file.close()
-                return extension.rstrip().split('.')[-1]
-            i = text.find(extension.strip(), i + 1)
-    file.close()
-    return -1
-
-def check_tld(text):
-    """Check for presence of Top-Level Domains (TLD)."""
-    file_path = './files/tlds.txt'
-    file = open(file_path, 'r')
-    pattern = re.compile("[a-zA-Z0-9.]")
-    for line in file:
-        i = (text.lower().strip()).find(line.strip())
-        while i > -1:
-            if ((i + len(line) - 1) >= len(text)) or not pattern.match(text[i + len(line) - 1]):
-                file.close()
-                return True
-            i = text.find(line.strip(), i + 1)
-    file.close()
-    return False
-
-def count_params(text):
-    """Return number of parameters."""
-    return len(parse.parse_qs(text))
-    
-def read_csv_file(archive):
-    """Read a CSV file and return its contents."""
-    data = []
-    with open(archive, 'r', newline='') as csvfile:
-        reader = csv.reader(csvfile)
-        for row in reader:
-            data.append(row)
-    return data
-
-
-def check_time_response(domain, timeout=3):
-    """Return the response time in seconds."""
-    try:
-        response = requests.get(domain, headers={'Cache-Control': 'no-cache'}, timeout=timeout)
-        latency = response.elapsed.total_seconds()
-        return latency
-    except requests.exceptions.Timeout:
-        return -1  # Return 'l' if the request times out
-    except requests.exceptions.RequestException:
-        return -1  # Return '?' if an error occurs
-
-
-def time_domain_activation(url):
-    """Get the domain activation time (creation date) in days for a given URL."""
-    try:
-        domain = url.split('/')[2]
-        domain_info = whois.whois(domain)
-
-        if domain_info.creation_date:
-            creation_date = domain_info.creation_date
-
-            if isinstance(creation_date, list):
-                creation_date = creation_date[0]
-
-            current_date = datetime.now()
-            activation_time_days = (current_date - creation_date).days
-
-            return activation_time_days
-        else:
-            return -1
-
-    except Exception as e:
-        return -1
-
-
-def time_domain_expiration(url):
-    """Get the domain expiration time (expiration date) in days for a given URL."""
-    try:
-        domain = url.split('/')[2]
-        domain_info = whois.whois(domain)
-
-        if domain_info.expiration_date:
-            expiration_date = domain_info.expiration_date
-
-            if isinstance(expiration_date, list):
-                expiration_date = expiration_date[0]
-
-            current_date = datetime.now()
-            time_until_expiration_days = (expiration_date - current_date).days
-
-            return time_until_expiration_days
-        else:
-            print(f"Failed to retrieve expiration date for the domain: {domain}")
-            return -1
-
-    except Exception as e:
-        print(f"Error occurred while fetching domain expiration time: {e}")
-        return -1
-
-
-def qty_redirects(url):
-    """Check if a URL is redirected."""
-    try:
-        response = requests.head(url, allow_redirects=True)
-        if response.status_code in (301, 302):
-            return True
-        else:
-            return False
-
-    except requests.RequestException as e:
-        print(f"Error occurred while checking URL redirection: {e}")
-        return None
-
-
-def shortner_URL(url):
-    match = re.search(shortening_services, url)
-    if match:
-        return True
-    else:
-        return False
-
-
-def main(url):
-    dict_url = start_url(url)
-
-    dot_url = str(count(dict_url['url'],'.'))
-    hyphe_url = str(count(dict_url['url'],'-'))
-    underline_url = str(count(dict_url['url'],'_'))
-    bar_url = str(count(dict_url['url'],'/'))
-    question_url = str(count(dict_url['url'],'?'))
-    equal_url = str(count(dict_url['url'],'='))
-    arroba_url = str(count(dict_url['url'],'@'))
-    ampersand_url = str(count(dict_url['url'],'&'))
-    exclamation_url = str(count(dict_url['url'], '!'))
-    blank_url = str(count(dict_url['url'], ' '))
-    til_url = str(count(dict_url['url'], '~'))
-    comma_url = str(count(dict_url['url'], ','))
-    plus_url = str(count(dict_url['url'], '+'))
-    asterisk_url = str(count(dict_url['url'], '*'))
-    hashtag_url = str(count(dict_url['url'], '#'))
-    money_sign_url = str(count(dict_url['url'], '$'))
-    percentage_url = str(count(dict_url['url'], '%'))
-    len_url = str(length(dict_url['url']))
-    email_exist = str(valid_email(dict_url['url']))
-    count_tld_url = str(count_tld(dict_url['url']))
-    count_alpha_url=str(EnglishLetterCount(dict_url['url']))
-    timeresponse_url=str(check_time_response(dict_url['url']))
-    time_domain_activation_url=str(time_domain_activation(dict_url['url']))
-    time_domain_expiration_url=str(time_domain_expiration(dict_url['url']))
-    Hasshortner_URL=str(shortner_URL(dict_url['url']))
-    dot_host = str(count(dict_url['host'], '.'))
-    hyphe_host = str(count(dict_url['host'], '-'))
-    underline_host = str(count(dict_url['host'], '_'))
-    bar_host = str(count(dict_url['host'], '/'))
-    question_host = str(count(dict_url['host'], '?'))
-    equal_host = str(count(dict_url['host'], '='))
-    arroba_host = str(count(dict_url['host'], '@'))
-    ampersand_host = str(count(dict_url['host'], '&'))
-    exclamation_host = str(count(dict_url['host'], '!'))
-    blank_host = str(count(dict_url['host'], ' '))
-    til_host = str(count(dict_url['host'], '~'))
-    comma_host = str(count(dict_url['host'], ','))
-    plus_host = str(count(dict_url['host'], '+'))
-    asterisk_host = str(count(dict_url['host'], '*'))
-    hashtag_host = str(count(dict_url['host'], '#'))
-    money_sign_host = str(count(dict_url['host'], '$'))
-    percentage_host = str(count(dict_url['host'], '%'))
-    vowels_host = str(count_vowels(dict_url['host']))
-    len_host = str(length(dict_url['host']))
-    ip_exist = str(valid_ip(dict_url['host']))
-    server_client = str(check_word_server_client(dict_url['host']))
-    if dict_url['path']:
-        dot_path = str(count(dict_url['path'], '.'))
-        hyphe_path = str(count(dict_url['path'], '-'))
-        underline_path = str(count(dict_url['path'], '_'))
-        bar_path = str(count(dict_url['path'], '/'))
-        question_path = str(count(dict_url['path'], '?'))
-        equal_path = str(count(dict_url['path'], '='))
-        arroba_path = str(count(dict_url['path'], '@'))
-        ampersand_path = str(count(dict_url['path'], '&'))
-        exclamation_path = str(count(dict_url['path'], '!'))
-        blank_path = str(count(dict_url['path'], ' '))
-        til_path = str(count(dict_url['path'], '~'))
-        comma_path = str(count(dict_url['path'], ','))
-        plus_path = str(count(dict_url['path'], '+'))
-        asterisk_path = str(count(dict_url['path'], '*'))
-        hashtag_path = str(count(dict_url['path'], '#'))
-        money_sign_path = str(count(dict_url['path'], '$'))
-        percentage_path = str(count(dict_url['path'], '%'))
-        len_path = str(length(dict_url['path']))
-    else:
-        dot_path = -1
-        hyphe_path = -1
-        underline_path = -1
-        bar_path = -1
-        question_path = -1
-        equal_path = -1
-        arroba_path = -1
-        ampersand_path = -1
-        exclamation_path = -1
-        blank_path = -1
-        til_path = -1
-        comma_path = -1
-        plus_path = -1
-        asterisk_path = -1
-        hashtag_path = -1
-        money_sign_path = -1
-        percentage_path = -1
-        len_path = -1
-    if dict_url['path']:
-        dot_file = str(count(posixpath.basename(dict_url['path']), '.'))
-        hyphe_file = str(count(posixpath.basename(dict_url['path']), '-'))
-        underline_file = str(count(posixpath.basename(dict_url['path']), '_'))
-        bar_file = str(count(posixpath.basename(dict_url['path']), '/'))
-        question_file = str(count(posixpath.basename(dict_url['path']), '?'))
-        equal_file = str(count(posixpath.basename(dict_url['path']), '='))
-        arroba_file = str(count(posixpath.basename(dict_url['path']), '@'))
-        ampersand_file = str(count(posixpath.basename(dict_url['path']), '&'))
-        exclamation_file = str(count(posixpath.basename(dict_url['path']), '!'))
-        blank_file = str(count(posixpath.basename(dict_url['path']), ' '))
-        til_file = str(count(posixpath.basename(dict_url['path']), '~'))
-        comma_file = str(count(posixpath.basename(dict_url['path']), ','))
-        plus_file = str(count(posixpath.basename(dict_url['path']), '+'))
-        asterisk_file = str(count(posixpath.basename(dict_url['path']), '*'))
-        hashtag_file = str(count(posixpath.basename(dict_url['path']), '#'))
-        money_sign_file = str(count(posixpath.basename(dict_url['path']), '$'))
-        percentage_file = str(count(posixpath.basename(dict_url['path']), '%'))
-        len_file = str(length(posixpath.basename(dict_url['path'])))
-        extension = str(extract_extension(posixpath.basename(dict_url['url'])))
-    else:
-        dot_file = -1
-        hyphe_file = -1
-        underline_file = -1
-        bar_file = -1
-        question_file = -1
-        equal_file = -1
-        arroba_file = -1
-        ampersand_file = -1
-        exclamation_file = -1
-        blank_file = -1
-        til_file = -1
-        comma_file = -1
-        plus_file = -1
-        asterisk_file = -1
-        hashtag_file = -1
-        money_sign_file = -1
-        percentage_file = -1
-        len_file = -1
-        extension = -1
-    if dict_url['query']:
-        dot_params = str(count(dict_url['query'], '.'))
-        hyphe_params = str(count(dict_url['query'], '-'))
-        underline_params = str(count(dict_url['query'], '_'))
-        bar_params = str(count(dict_url['query'], '/'))
-        question_params = str(count(dict_url['query'], '?'))
-        equal_params = str(count(dict_url['query'], '='))
-        arroba_params = str(count(dict_url['query'], '@'))
-        ampersand_params = str(count(dict_url['query'], '&'))
-        exclamation_params = str(count(dict_url['query'], '!'))
-        blank_params = str(count(dict_url['query'], ' '))
-        til_params = str(count(dict_url['query'], '~'))
-        comma_params = str(count(dict_url['query'], ','))
-        plus_params = str(count(dict_url['query'], '+'))
-        asterisk_params = str(count(dict_url['query'], '*'))
-        hashtag_params = str(count(dict_url['query'], '#'))
-        money_sign_params = str(count(dict_url['query'], '$'))
-        percentage_params = str(count(dict_url['query'], '%'))
-        len_params = str(length(dict_url['query']))
-        tld_params = str(check_tld(dict_url['query']))
-        number_params = str(count_params(dict_url['query']))
-    else:
-        dot_params = -1
-        hyphe_params = -1
-        underline_params = -1
-        bar_params = -1
-        question_params = -1
-        equal_params = -1
-        arroba_params = -1
-        ampersand_params = -1
-        exclamation_params = -1
-        blank_params = -1
-        til_params = -1
-        comma_params = -1
-        plus_params = -1
-        asterisk_params = -1
-        hashtag_params = -1
-        money_sign_params = -1
-        percentage_params = -1
-        len_params = -1
-        tld_params = -1
-        number_params = -1
-
-
-    _lexical = [ dot_url, hyphe_url, underline_url, bar_url, question_url,
-                        equal_url, arroba_url, ampersand_url, exclamation_url, blank_url, 
-                        til_url, comma_url, plus_url, asterisk_url, hashtag_url,
-                        money_sign_url, percentage_url, count_tld_url, len_url, count_alpha_url,
-                        timeresponse_url, time_domain_activation_url, time_domain_expiration_url, Hasshortner_URL, dot_host,
-                        hyphe_host, underline_host, bar_host, question_host, equal_host,
-                        arroba_host, ampersand_host, exclamation_host, blank_host, til_host,
-                        comma_host, plus_host, asterisk_host, hashtag_host, money_sign_host,
-                        percentage_host, vowels_host, len_host, ip_exist, server_client,
-                        dot_path, hyphe_path, underline_path, bar_path, question_path,
-                        equal_path, arroba_path, ampersand_path, exclamation_path,   blank_path, 
-                        til_path, comma_path, plus_path, asterisk_path,  hashtag_path, 
-                        money_sign_path, percentage_path, len_path, dot_file,      hyphe_file,
-                        underline_file, bar_file, question_file, equal_file, arroba_file,
-                        ampersand_file, exclamation_file, blank_file, til_file, comma_file,
-                        plus_file, asterisk_file, hashtag_file, money_sign_file, percentage_file, 
-                        len_file, dot_params, hyphe_params, underline_params, bar_params, 
-                        question_params,equal_params, arroba_params, ampersand_params, exclamation_params,
-                        blank_params, til_params, comma_params, plus_params, asterisk_params,
-                        hashtag_params, money_sign_params, percentage_params, len_params, number_params, email_exist]
-                
-    return _lexical
-from urllib import parse
-import re
-import ipaddress
-import posixpath
-import csv
-from datetime import datetime
-import requests
-from urllib.parse import urlparse, parse_qs
-import whois
-from datetime import datetime
-import requests
+# Shared keep-alive pools; plain requests calls if the package isn't importable
+try:
+    from models import http_client
+except Exception:
+    http_client = requests
 #from googlesearch import search
 #import ssl
 #import socket
 #import dns.resolver
 
+# Bump whenever a change alters extracted values; stored feature vectors are
+# keyed by it (see services/feature_store.py).
+FEATURE_VERSION = 1
+
 def attributes():
     """Output file attributes."""
     lexical = [
@@ -637,6 +171,50 @@ def length(text):
     """Return the length of a string."""
     return len(text)
 
+
+# Characters counted in every URL component, in attributes() order
+# (dot, hyphe, underline, bar, question, equal, arroba, ampersand, exclamation,
+# blank, til, comma, plus, asterisk, hashtag, money_sign, percentage).
+TRACKED_CHARS = ('.', '-', '_', '/', '?', '=', '@', '&', '!', ' ', '~', ',', '+', '*', '#', '$', '%')
+N_TRACKED_CHARS = len(TRACKED_CHARS)
+# Extra slots appended by char_histogram() after the tracked characters.
+VOWELS_INDEX = N_TRACKED_CHARS
+LETTERS_INDEX = N_TRACKED_CHARS + 1
+
+_ENGLISH_LETTERS = frozenset(string.ascii_letters)
+_VOWELS = frozenset('aeiouAEIOU')
+
+
+def char_histogram(text):
+    """Count tracked characters, vowels and English letters in one pass.
+
+    Returns a fixed-size list: one count per TRACKED_CHARS entry, followed by
+    the vowel count (as count_vowels) and the letter count (as EnglishLetterCount).
+    """
+    counts = Counter(text)
+    table = [counts.get(ch, 0) for ch in TRACKED_CHARS]
+    vowels = 0
+    letters = 0
+    for ch, n in counts.items():
+        if ch in _ENGLISH_LETTERS:
+            letters += n
+            if ch in _VOWELS:
+                vowels += n
+        elif ch > '\x7f':
+            # some non-ASCII characters lowercase to an ASCII vowel (e.g. 'İ')
+            vowels += n * sum(ch.lower().count(v) for v in 'aeiou')
+    table.append(vowels)
+    table.append(letters)
+    return table
+
+
+def _counts_and_length(text):
+    """Return the tracked character counts and the length of text as strings."""
+    hist = char_histogram(text)
+    row = [str(n) for n in hist[:N_TRACKED_CHARS]]
+    row.append(str(len(text)))
+    return row
+
 def valid_ip(host):
     """Return if the domain has a valid IP format (IPv4 or IPv6)."""
     try:
@@ -665,51 +243,106 @@ def check_word_server_client(text):
         return True
     return False
 
+# Characters that may not follow a TLD/extension match (the match would be
+# part of a longer token).
+_TOKEN_CHARS = frozenset(string.ascii_letters + string.digits + '.')
+
+
+class PatternMatcher:
+    """Aho-Corasick automaton over a fixed list of patterns.
+
+    Text is lowercased before matching. An occurrence counts only if it ends
+    the text or is followed by a character outside [a-zA-Z0-9.]. Lookups take
+    time proportional to the text length, independent of the number of patterns.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = [p.strip() for p in patterns if p.strip()]
+        goto = [{}]
+        out = [()]
+        for pid, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append(())
+                state = nxt
+            out[state] = out[state] + (pid,)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] = out[nxt] + out[fail[nxt]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    def iter_matches(self, text):
+        """Yield the pattern index of every occurrence that passes the boundary rule."""
+        text = text.lower()
+        goto, fail, out = self._goto, self._fail, self._out
+        n = len(text)
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state] and (i + 1 >= n or text[i + 1] not in _TOKEN_CHARS):
+                yield from out[state]
+
+    def count(self, text):
+        """Return the number of occurrences of all patterns in text."""
+        return sum(1 for _ in self.iter_matches(text))
+
+    def contains(self, text):
+        """Return whether any pattern occurs in text."""
+        return next(self.iter_matches(text), None) is not None
+
+    def first(self, text):
+        """Return the earliest-listed pattern occurring in text, or None."""
+        pids = set(self.iter_matches(text))
+        return self.patterns[min(pids)] if pids else None
+
+
+def _load_matcher(name):
+    """Build a PatternMatcher from one of the bundled lists in ./files."""
+    file_path = os.path.join(os.path.dirname(__file__), 'files', name)
+    try:
+        with open(file_path, 'r') as file:
+            return PatternMatcher(file)
+    except OSError:
+        return PatternMatcher([])
+
+
+_TLD_MATCHER = _load_matcher('tlds.txt')
+_EXTENSION_MATCHER = _load_matcher('extensions.txt')
+
+
 def count_tld(text):
     """Return amount of Top-Level Domains (TLD) present in the URL."""
-    file_path = os.path.join(os.path.dirname(__file__), 'files', 'tlds.txt')
-    file = open(file_path, 'r')
-    count = 0
-    pattern = re.compile("[a-zA-Z0-9.]")
-    for line in file:
-        i = (text.lower().strip()).find(line.strip())
-        while i > -1:
-            if ((i + len(line) - 1) >= len(text)) or not pattern.match(text[i + len(line) - 1]):
-                count += 1
-            i = text.find(line.strip(), i + 1)
-    file.close()
-    return count
+    return _TLD_MATCHER.count(text)
 
 def extract_extension(text):
     """Return file extension name."""
-    file_path = os.path.join(os.path.dirname(__file__), 'files', 'extensions.txt')
-    file = open(file_path, 'r')
-
-    pattern = re.compile("[a-zA-Z0-9.]")
-    for extension in file:
-        i = (text.lower().strip()).find(extension.strip())
-        while i > -1:
-            if ((i + len(extension) - 1) >= len(text)) or not pattern.match(text[i + len(extension) - 1]):
-                file.close()
-                return extension.rstrip().split('.')[-1]
-            i = text.find(extension.strip(), i + 1)
-    file.close()
-    return '?'
+    extension = _EXTENSION_MATCHER.first(text)
+    if extension is None:
+        return '?'
+    return extension.split('.')[-1]
 
 def check_tld(text):
     """Check for presence of Top-Level Domains (TLD)."""
-    file_path = os.path.join(os.path.dirname(__file__), 'files', 'tlds.txt')
-    file = open(file_path, 'r')
-    pattern = re.compile("[a-zA-Z0-9.]")
-    for line in file:
-        i = (text.lower().strip()).find(line.strip())
-        while i > -1:
-            if ((i + len(line) - 1) >= len(text)) or not pattern.match(text[i + len(line) - 1]):
-                file.close()
-                return True
-            i = text.find(line.strip(), i + 1)
-    file.close()
-    return False
+    return _TLD_MATCHER.contains(text)
 
 def count_params(text):
     """Return number of parameters."""
@@ -727,10 +360,15 @@ def read_csv_file(archive):
 
 
 def check_time_response(domain, timeout=3):
-    """Return the response time in seconds."""
+    """Return the response time in seconds (time to the response headers)."""
     try:
-        response = requests.get(domain, headers={'Cache-Control': 'no-cache'}, timeout=timeout)
+        # the body is never read; response.elapsed stops at the headers
+        response = http_client.get(domain, headers={'Cache-Control': 'no-cache'}, timeout=timeout, stream=True)
         latency = response.elapsed.total_seconds()
+        if hasattr(http_client, 'discard'):
+            http_client.discard(response)
+        else:
+            response.close()
         return latency
     except requests.exceptions.Timeout:
         return '>3'  # Return 'l' if the request times out
@@ -738,26 +376,209 @@ def check_time_response(domain, timeout=3):
         return '?'  # Return '?' if an error occurs
 
 
+def shared_time_response(get_elapsed, for_url, timeout=3):
+    """Build a check_time_response probe that reuses another request's response.
+
+    get_elapsed() returns the seconds until that response's headers arrived
+    (None when unknown) or raises the error its request failed with. URLs
+    other than for_url, and unknown times, are probed as usual. Both sides
+    are compared as start_url() gives them, so a scheme-less for_url still
+    matches the scheme-prefixed URL the extractor probes.
+    """
+    for_url = start_url(for_url)['url']
+
+    def probe(url):
+        if start_url(url)['url'] != for_url:
+            return check_time_response(url, timeout)
+        try:
+            latency = get_elapsed()
+        except requests.exceptions.Timeout:
+            return '>3'
+        except Exception:
+            return '?'
+        if latency is None:
+            return check_time_response(url, timeout)
+        return '>3' if latency > timeout else latency
+    return probe
+
+
+def registrable_domain(host):
+    """Return the registrable domain (e.g. example.co.uk) used as WHOIS key."""
+    try:
+        host = urlparse('//' + (host or '').strip()).hostname or ''
+    except ValueError:
+        host = (host or '').strip().lower()
+    host = host.rstrip('.')
+    if not host or valid_ip(host):
+        return host
+    if get_fld is not None:
+        fld = get_fld(host, fix_protocol=True, fail_silently=True)
+        if fld:
+            return fld
+    return '.'.join(host.split('.')[-2:])
+
+
+def _accepts_timeout(func):
+    """True if func takes a timeout keyword (python-whois only does in newer releases)."""
+    try:
+        params = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    return any(p.name == 'timeout' or p.kind is p.VAR_KEYWORD for p in params)
+
+
+def _first_date(value):
+    """Return the first date of a WHOIS date field (which may be a list)."""
+    if isinstance(value, list):
+        value = value[0] if value else None
+    return value if isinstance(value, datetime) else None
+
+
+class WhoisCache:
+    """TTL cache of WHOIS creation/expiration dates keyed by registrable domain.
+
+    - failed lookups are cached for negative_ttl seconds
+    - concurrent lookups of the same domain share one WHOIS query; callers
+      waiting on it give up (None) after timeout + FLIGHT_MARGIN seconds
+    - with db_path set, entries are also kept in a SQLite table so a restarted
+      worker starts warm
+    """
+
+    # seconds a caller waits beyond timeout for a lookup another caller runs
+    FLIGHT_MARGIN = 2
+
+    def __init__(self, ttl=86400, negative_ttl=3600, db_path=None, maxsize=50000, lookup=None, timeout=5):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self.db_path = db_path
+        self.maxsize = maxsize
+        self._lookup = lookup or whois.whois
+        self._lookup_timeout = _accepts_timeout(self._lookup)
+        self._entries = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        if db_path:
+            self._init_db()
+
+    def _get_conn(self):
+        return sqlite3.connect(self.db_path)
+
+    def _init_db(self):
+        conn = self._get_conn()
+        conn.execute('''CREATE TABLE IF NOT EXISTS whois_cache
+                        (domain TEXT PRIMARY KEY,
+                         record TEXT,
+                         expires_at REAL)''')
+        conn.commit()
+        conn.close()
+
+    def _db_get(self, domain):
+        conn = self._get_conn()
+        row = conn.execute('SELECT record, expires_at FROM whois_cache WHERE domain=?', (domain,)).fetchone()
+        conn.close()
+        if not row or row[1] <= time.time():
+            return None
+        data = json.loads(row[0])
+        if data is None:
+            return (None, row[1])
+        record = {k: datetime.fromisoformat(v) if v else None for k, v in data.items()}
+        return (record, row[1])
+
+    def _db_put(self, domain, record, expires_at):
+        data = None
+        if record is not None:
+            data = {k: v.isoformat() if v else None for k, v in record.items()}
+        conn = self._get_conn()
+        conn.execute('INSERT OR REPLACE INTO whois_cache (domain, record, expires_at) VALUES (?,?,?)',
+                     (domain, json.dumps(data), expires_at))
+        conn.commit()
+        conn.close()
+
+    def _query(self, domain):
+        """Run the WHOIS query; return a dates dict or None on failure."""
+        try:
+            if self._lookup_timeout:
+                info = self._lookup(domain, timeout=self.timeout)
+            else:
+                info = self._lookup(domain)
+        except Exception:
+            return None
+        if not info:
+            return None
+        return {
+            'creation_date': _first_date(getattr(info, 'creation_date', None)),
+            'expiration_date': _first_date(getattr(info, 'expiration_date', None)),
+        }
+
+    def _store(self, domain, record, expires_at):
+        with self._lock:
+            self._entries.pop(domain, None)
+            if len(self._entries) >= self.maxsize:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[domain] = (record, expires_at)
+
+    def get(self, host):
+        """Return {'creation_date', 'expiration_date'} for host, or None if WHOIS failed."""
+        domain = registrable_domain(host)
+        with self._lock:
+            entry = self._entries.get(domain)
+            if entry and entry[1] > time.time():
+                return entry[0]
+            flight = self._inflight.get(domain)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[domain] = {'event': threading.Event(), 'record': None}
+        if not leader:
+            # a stalled leader must not hold every caller for this domain
+            if not flight['event'].wait(self.timeout + self.FLIGHT_MARGIN):
+                return None
+            return flight['record']
+
+        record = None
+        try:
+            entry = self._db_get(domain) if self.db_path else None
+            if entry:
+                record, expires_at = entry
+            else:
+                record = self._query(domain)
+                expires_at = time.time() + (self.ttl if record is not None else self.negative_ttl)
+                if self.db_path:
+                    self._db_put(domain, record, expires_at)
+            self._store(domain, record, expires_at)
+        finally:
+            flight['record'] = record
+            with self._lock:
+                self._inflight.pop(domain, None)
+            flight['event'].set()
+        return record
+
+    def clear(self):
+        """Drop all in-memory entries (the SQLite table is left untouched)."""
+        with self._lock:
+            self._entries.clear()
+
+
+# Process-wide WHOIS cache; WHOIS_CACHE_TTL / WHOIS_CACHE_DB tune it per deployment.
+WHOIS_CACHE = WhoisCache(
+    ttl=int(os.environ.get('WHOIS_CACHE_TTL', 86400)),
+    db_path=os.environ.get('WHOIS_CACHE_DB') or None,
+)
+
+
 def time_domain_activation(url):
     """Get the domain activation time (creation date) in days for a given URL."""
     try:
         # Parse the URL to extract the domain
         domain = url.split('/')[2]  # Extract domain from URL (assuming URL is in valid format)
 
-        # Fetch WHOIS information for the domain
-        domain_info = whois.whois(domain)
-
-        if domain_info.creation_date:
-            # Get the domain creation date
-            creation_date = domain_info.creation_date
-
-            if isinstance(creation_date, list):
-                # Use the first creation date if multiple dates are returned (common for some domains)
-                creation_date = creation_date[0]
+        # WHOIS information is shared with time_domain_expiration through WHOIS_CACHE
+        domain_info = WHOIS_CACHE.get(domain)
 
+        if domain_info and domain_info['creation_date']:
             # Calculate the number of days since the domain was created
             current_date = datetime.now()
-            activation_time_days = (current_date - creation_date).days
+            activation_time_days = (current_date - domain_info['creation_date']).days
 
             return activation_time_days
         else:
@@ -775,36 +596,29 @@ def time_domain_expiration(url):
         # Parse the URL to extract the domain
         domain = url.split('/')[2]  # Extract domain from URL (assuming URL is in valid format)
 
-        # Fetch WHOIS information for the domain
-        domain_info = whois.whois(domain)
-
-        if domain_info.expiration_date:
-            # Get the domain expiration date
-            expiration_date = domain_info.expiration_date
-
-            if isinstance(expiration_date, list):
-                # Use the first expiration date if multiple dates are returned (common for some domains)
-                expiration_date = expiration_date[0]
+        # WHOIS information is shared with time_domain_activation through WHOIS_CACHE
+        domain_info = WHOIS_CACHE.get(domain)
 
+        if domain_info and domain_info['expiration_date']:
             # Calculate the number of days until the domain expires
             current_date = datetime.now()
-            time_until_expiration_days = (expiration_date - current_date).days
+            time_until_expiration_days = (domain_info['expiration_date'] - current_date).days
 
             return time_until_expiration_days
         else:
-            print(f"Failed to retrieve expiration date for the domain: {domain}")
+            #print(f"Failed to retrieve expiration date for the domain: {domain}")
             return '?'
 
     except Exception as e:
-        print(f"Error occurred while fetching domain expiration time: {e}")
+        #print(f"Error occurred while fetching domain expiration time: {e}")
         return '?'
 
 
-def qty_redirects(url):
+def qty_redirects(url, timeout=3):
     """Check if a URL is redirected."""
     try:
         # Send an HTTP HEAD request to the URL
-        response = requests.head(url, allow_redirects=True)
+        response = http_client.head(url, allow_redirects=True, timeout=timeout)
 
         # Check if the response has a redirect status code
         if response.status_code in (301, 302):
@@ -817,220 +631,362 @@ def qty_redirects(url):
         return None
 
 
+# Value for a network feature whose probe did not finish before the deadline.
+NETWORK_TIMEOUT_SENTINEL = -1
+# Overall time budget (seconds) for all network probes of one URL.
+NETWORK_DEADLINE = float(os.environ.get('NETWORK_FEATURE_DEADLINE', 5))
+# Network features computed by main(), in attributes() order.
+NETWORK_PROBES = (
+    ('timeresponse_url', check_time_response),
+    ('time_domain_activation_url', time_domain_activation),
+    ('time_domain_expiration_url', time_domain_expiration),
+)
+
+# Extraction tiers, cheapest first. 'lexical' makes no network calls,
+# 'standard' adds the (cached) WHOIS lookups, 'full' also probes the site.
+EXTRACTION_TIERS = ('lexical', 'standard', 'full')
+TIER_NETWORK_FEATURES = {
+    'lexical': (),
+    'standard': ('time_domain_activation_url', 'time_domain_expiration_url'),
+    'full': tuple(name for name, _ in NETWORK_PROBES),
+}
+# Value written for a network feature that the chosen tier skips; '?' is the
+# same "unknown" the probes report when a lookup fails.
+NETWORK_IMPUTATION = {name: '?' for name, _ in NETWORK_PROBES}
+
+
+def tier_probes(tier, overrides=None):
+    """Return the NETWORK_PROBES entries run by an extraction tier.
+
+    overrides maps feature names to functions used instead of the default
+    probe (e.g. one reading a response another detector already has).
+    """
+    if tier not in TIER_NETWORK_FEATURES:
+        raise ValueError(f'Unknown extraction tier: {tier!r} (expected one of {EXTRACTION_TIERS})')
+    wanted = TIER_NETWORK_FEATURES[tier]
+    overrides = overrides or {}
+    return tuple((name, overrides.get(name, func)) for name, func in NETWORK_PROBES if name in wanted)
+
+
+_NETWORK_POOL = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('NETWORK_FEATURE_WORKERS', 32)),
+    thread_name_prefix='url-network',
+)
+
+
+def network_features(url, deadline=None, probes=None):
+    """Run the network probes for url concurrently under one deadline.
+
+    Returns a dict of feature name -> value. Probes that have not finished
+    after deadline seconds (NETWORK_DEADLINE by default) are reported as
+    NETWORK_TIMEOUT_SENTINEL; a probe that raises is reported as '?'.
+    """
+    return network_features_batch([url], probes, deadline)[0]
+
+
+def network_features_batch(urls, probes=None, deadline=None):
+    """network_features() for many URLs under one deadline for the batch.
+
+    Every (URL, probe) pair goes to the shared network pool at once; pairs
+    not finished after deadline seconds (NETWORK_DEADLINE by default) are
+    reported as NETWORK_TIMEOUT_SENTINEL, and those still queued are
+    cancelled. Returns one dict per URL, in order.
+    """
+    if deadline is None:
+        deadline = NETWORK_DEADLINE
+    if probes is None:
+        probes = NETWORK_PROBES
+    if not probes:
+        return [{} for _ in urls]
+    futures = [{name: _NETWORK_POOL.submit(func, url) for name, func in probes} for url in urls]
+    done, not_done = wait([f for row in futures for f in row.values()], timeout=deadline)
+    # probes already running cannot be stopped; they end on their own timeouts
+    for future in not_done:
+        future.cancel()
+    outs = []
+    for row in futures:
+        out = {}
+        for name, future in row.items():
+            if future not in done:
+                out[name] = NETWORK_TIMEOUT_SENTINEL
+                continue
+            try:
+                out[name] = future.result()
+            except Exception:
+                out[name] = '?'
+        outs.append(out)
+    return outs
+
+
+def load_shorteners(file_path=None):
+    """Read a shortener host list (one host per line, '#' starts a comment)."""
+    if file_path is None:
+        file_path = os.path.join(os.path.dirname(__file__), 'files', 'shorteners.txt')
+    hosts = set()
+    try:
+        with open(file_path, 'r') as file:
+            for line in file:
+                host = line.split('#', 1)[0].strip().lower().rstrip('.')
+                if host:
+                    hosts.add(host)
+    except OSError:
+        pass
+    return frozenset(hosts)
+
+
+# Registry of shortener hosts; extend files/shorteners.txt to add services.
+SHORTENER_HOSTS = load_shorteners()
+
+
+def is_shortener_host(host, registry=None):
+    """Return whether host, or any parent domain of it, is a known shortener.
+
+    Walks the host's label suffixes (www.bit.ly -> bit.ly -> ly), so the cost
+    is one set lookup per label.
+    """
+    if registry is None:
+        registry = SHORTENER_HOSTS
+    host = (host or '').lower().rstrip('.')
+    while host:
+        if host in registry:
+            return True
+        dot = host.find('.')
+        if dot < 0:
+            return False
+        host = host[dot + 1:]
+    return False
+
+
 def shortner_URL(url):
-    match = re.search(shortening_services, url)
-    if match:
-        return True
-    else:
+    """Return whether the URL's host belongs to a known URL shortener."""
+    try:
+        if not urlparse(url.strip()).scheme:
+            url = 'http://' + url.strip()
+        host = urlparse(url.strip()).hostname
+    except ValueError:
         return False
+    return is_shortener_host(host)
 
 
-def main(url):
+def main(url, tier='full'):
     #with open(dataset, "w") as output:
         #writer = csv.writer(output)
         #writer.writerow(attributes())
         #count_url = 0
         #for url in read_file(urls):
         #    count_url = count_url + 1
+            probes = tier_probes(tier)
             dict_url = start_url(url)
+            full_url = dict_url['url']
+            host = dict_url['host']
+            path = dict_url['path']
+            query = dict_url['query']
 
             """LEXICAL"""
+            # Each component is scanned once by char_histogram(); the vector keeps
+            # the attributes() order (without tld_params and extension).
             # URL
-            dot_url = str(count(dict_url['url'],'.'))
-            hyphe_url = str(count(dict_url['url'],'-'))
-            underline_url = str(count(dict_url['url'],'_'))
-            bar_url = str(count(dict_url['url'],'/'))
-            question_url = str(count(dict_url['url'],'?'))
-            equal_url = str(count(dict_url['url'],'='))
-            arroba_url = str(count(dict_url['url'],'@'))
-            ampersand_url = str(count(dict_url['url'],'&'))
-            exclamation_url = str(count(dict_url['url'], '!'))
-            blank_url = str(count(dict_url['url'], ' '))
-            til_url = str(count(dict_url['url'], '~'))
-            comma_url = str(count(dict_url['url'], ','))
-            plus_url = str(count(dict_url['url'], '+'))
-            asterisk_url = str(count(dict_url['url'], '*'))
-            hashtag_url = str(count(dict_url['url'], '#'))
-            money_sign_url = str(count(dict_url['url'], '$'))
-            percentage_url = str(count(dict_url['url'], '%'))
-            len_url = str(length(dict_url['url']))
-            email_exist = str(valid_email(dict_url['url']))
-            count_tld_url = str(count_tld(dict_url['url']))
-            count_alpha_url=str(EnglishLetterCount(dict_url['url']))
-            timeresponse_url=str(check_time_response(dict_url['url']))
-            time_domain_activation_url=str(time_domain_activation(dict_url['url']))
-            time_domain_expiration_url=str(time_domain_expiration(dict_url['url']))
-            Hasshortner_URL=str(shortner_URL(dict_url['url']))
-             # DOMAIN
-            dot_host = str(count(dict_url['host'], '.'))
-            hyphe_host = str(count(dict_url['host'], '-'))
-            underline_host = str(count(dict_url['host'], '_'))
-            bar_host = str(count(dict_url['host'], '/'))
-            question_host = str(count(dict_url['host'], '?'))
-            equal_host = str(count(dict_url['host'], '='))
-            arroba_host = str(count(dict_url['host'], '@'))
-            ampersand_host = str(count(dict_url['host'], '&'))
-            exclamation_host = str(count(dict_url['host'], '!'))
-            blank_host = str(count(dict_url['host'], ' '))
-            til_host = str(count(dict_url['host'], '~'))
-            comma_host = str(count(dict_url['host'], ','))
-            plus_host = str(count(dict_url['host'], '+'))
-            asterisk_host = str(count(dict_url['host'], '*'))
-            hashtag_host = str(count(dict_url['host'], '#'))
-            money_sign_host = str(count(dict_url['host'], '$'))
-            percentage_host = str(count(dict_url['host'], '%'))
-            vowels_host = str(count_vowels(dict_url['host']))
-            len_host = str(length(dict_url['host']))
-            ip_exist = str(valid_ip(dict_url['host']))
-            server_client = str(check_word_server_client(dict_url['host']))
-             # DIRECTORY
-            if dict_url['path']:
-                dot_path = str(count(dict_url['path'], '.'))
-                hyphe_path = str(count(dict_url['path'], '-'))
-                underline_path = str(count(dict_url['path'], '_'))
-                bar_path = str(count(dict_url['path'], '/'))
-                question_path = str(count(dict_url['path'], '?'))
-                equal_path = str(count(dict_url['path'], '='))
-                arroba_path = str(count(dict_url['path'], '@'))
-                ampersand_path = str(count(dict_url['path'], '&'))
-                exclamation_path = str(count(dict_url['path'], '!'))
-                blank_path = str(count(dict_url['path'], ' '))
-                til_path = str(count(dict_url['path'], '~'))
-                comma_path = str(count(dict_url['path'], ','))
-                plus_path = str(count(dict_url['path'], '+'))
-                asterisk_path = str(count(dict_url['path'], '*'))
-                hashtag_path = str(count(dict_url['path'], '#'))
-                money_sign_path = str(count(dict_url['path'], '$'))
-                percentage_path = str(count(dict_url['path'], '%'))
-                len_path = str(length(dict_url['path']))
-            else:
-                dot_path = '?'
-                hyphe_path = '?'
-                underline_path = '?'
-                bar_path = '?'
-                question_path = '?'
-                equal_path = '?'
-                arroba_path = '?'
-                ampersand_path = '?'
-                exclamation_path = '?'
-                blank_path = '?'
-                til_path = '?'
-                comma_path = '?'
-                plus_path = '?'
-                asterisk_path = '?'
-                hashtag_path = '?'
-                money_sign_path = '?'
-                percentage_path = '?'
-                len_path = '?'
-            # FILE
-            if dict_url['path']:
-                dot_file = str(count(posixpath.basename(dict_url['path']), '.'))
-                hyphe_file = str(count(posixpath.basename(dict_url['path']), '-'))
-                underline_file = str(count(posixpath.basename(dict_url['path']), '_'))
-                bar_file = str(count(posixpath.basename(dict_url['path']), '/'))
-                question_file = str(count(posixpath.basename(dict_url['path']), '?'))
-                equal_file = str(count(posixpath.basename(dict_url['path']), '='))
-                arroba_file = str(count(posixpath.basename(dict_url['path']), '@'))
-                ampersand_file = str(count(posixpath.basename(dict_url['path']), '&'))
-                exclamation_file = str(count(posixpath.basename(dict_url['path']), '!'))
-                blank_file = str(count(posixpath.basename(dict_url['path']), ' '))
-                til_file = str(count(posixpath.basename(dict_url['path']), '~'))
-                comma_file = str(count(posixpath.basename(dict_url['path']), ','))
-                plus_file = str(count(posixpath.basename(dict_url['path']), '+'))
-                asterisk_file = str(count(posixpath.basename(dict_url['path']), '*'))
-                hashtag_file = str(count(posixpath.basename(dict_url['path']), '#'))
-                money_sign_file = str(count(posixpath.basename(dict_url['path']), '$'))
-                percentage_file = str(count(posixpath.basename(dict_url['path']), '%'))
-                len_file = str(length(posixpath.basename(dict_url['path'])))
-                extension = str(extract_extension(posixpath.basename(dict_url['url'])))
+            url_hist = char_histogram(full_url)
+            _lexical = [str(n) for n in url_hist[:N_TRACKED_CHARS]]
+            _lexical.append(str(count_tld(full_url)))
+            _lexical.append(str(len(full_url)))
+            _lexical.append(str(url_hist[LETTERS_INDEX]))
+            # network features skipped by the tier get NETWORK_IMPUTATION
+            network = network_features(full_url, probes=probes)
+            _lexical.extend(str(network.get(name, NETWORK_IMPUTATION[name])) for name, _ in NETWORK_PROBES)
+            _lexical.append(str(shortner_URL(full_url)))
+            # DOMAIN
+            host_hist = char_histogram(host)
+            _lexical.extend(str(n) for n in host_hist[:N_TRACKED_CHARS])
+            _lexical.append(str(host_hist[VOWELS_INDEX]))
+            _lexical.append(str(len(host)))
+            _lexical.append(str(valid_ip(host)))
+            _lexical.append(str(check_word_server_client(host)))
+            # DIRECTORY + FILE
+            if path:
+                _lexical.extend(_counts_and_length(path))
+                _lexical.extend(_counts_and_length(posixpath.basename(path)))
             else:
-                dot_file = '?'
-                hyphe_file = '?'
-                underline_file = '?'
-                bar_file = '?'
-                question_file = '?'
-                equal_file = '?'
-                arroba_file = '?'
-                ampersand_file = '?'
-                exclamation_file = '?'
-                blank_file = '?'
-                til_file = '?'
-                comma_file = '?'
-                plus_file = '?'
-                asterisk_file = '?'
-                hashtag_file = '?'
-                money_sign_file = '?'
-                percentage_file = '?'
-                len_file = '?'
-                extension = '?'
+                _lexical.extend(['?'] * (2 * (N_TRACKED_CHARS + 1)))
             # PARAMETERS
-            if dict_url['query']:
-                dot_params = str(count(dict_url['query'], '.'))
-                hyphe_params = str(count(dict_url['query'], '-'))
-                underline_params = str(count(dict_url['query'], '_'))
-                bar_params = str(count(dict_url['query'], '/'))
-                question_params = str(count(dict_url['query'], '?'))
-                equal_params = str(count(dict_url['query'], '='))
-                arroba_params = str(count(dict_url['query'], '@'))
-                ampersand_params = str(count(dict_url['query'], '&'))
-                exclamation_params = str(count(dict_url['query'], '!'))
-                blank_params = str(count(dict_url['query'], ' '))
-                til_params = str(count(dict_url['query'], '~'))
-                comma_params = str(count(dict_url['query'], ','))
-                plus_params = str(count(dict_url['query'], '+'))
-                asterisk_params = str(count(dict_url['query'], '*'))
-                hashtag_params = str(count(dict_url['query'], '#'))
-                money_sign_params = str(count(dict_url['query'], '$'))
-                percentage_params = str(count(dict_url['query'], '%'))
-                len_params = str(length(dict_url['query']))
-                tld_params = str(check_tld(dict_url['query']))
-                number_params = str(count_params(dict_url['query']))
+            if query:
+                _lexical.extend(_counts_and_length(query))
+                _lexical.append(str(count_params(query)))
             else:
-                dot_params = '?'
-                hyphe_params = '?'
-                underline_params = '?'
-                bar_params = '?'
-                question_params = '?'
-                equal_params = '?'
-                arroba_params = '?'
-                ampersand_params = '?'
-                exclamation_params = '?'
-                blank_params = '?'
-                til_params = '?'
-                comma_params = '?'
-                plus_params = '?'
-                asterisk_params = '?'
-                hashtag_params = '?'
-                money_sign_params = '?'
-                percentage_params = '?'
-                len_params = '?'
-                tld_params = '?'
-                number_params = '?'
-
-
-
-            _lexical = [
-            dot_url, hyphe_url, underline_url, bar_url, question_url,
-            equal_url, arroba_url, ampersand_url, exclamation_url,
-            blank_url, til_url, comma_url, plus_url, asterisk_url, hashtag_url,
-            money_sign_url, percentage_url, count_tld_url, len_url,count_alpha_url,timeresponse_url,time_domain_activation_url,time_domain_expiration_url,Hasshortner_URL,dot_host,
-            hyphe_host, underline_host, bar_host, question_host, equal_host,
-            arroba_host, ampersand_host, exclamation_host, blank_host, til_host,
-            comma_host, plus_host, asterisk_host, hashtag_host, money_sign_host,
-            percentage_host, vowels_host, len_host, ip_exist, server_client,
-            dot_path, hyphe_path, underline_path, bar_path, question_path,
-            equal_path, arroba_path, ampersand_path, exclamation_path,
-            blank_path, til_path, comma_path, plus_path, asterisk_path,
-            hashtag_path, money_sign_path, percentage_path, len_path, dot_file,
-            hyphe_file, underline_file, bar_file, question_file, equal_file,
-            arroba_file, ampersand_file, exclamation_file, blank_file,
-            til_file, comma_file, plus_file, asterisk_file, hashtag_file,
-            money_sign_file, percentage_file, len_file, dot_params,
-            hyphe_params, underline_params, bar_params, question_params,
-            equal_params, arroba_params, ampersand_params, exclamation_params,
-            blank_params, til_params, comma_params, plus_params, asterisk_params,
-            hashtag_params, money_sign_params, percentage_params, len_params, number_params, email_exist
-            ]
-                
+                _lexical.extend(['?'] * (N_TRACKED_CHARS + 2))
+            _lexical.append(str(valid_email(full_url)))
+
             return _lexical
 
+
+# Column names of the vector returned by main(): attributes() without
+# tld_params and extension, which main() does not emit.
+VECTOR_ATTRIBUTES = [a for a in attributes() if a not in ('tld_params', 'extension')]
+
+# Byte -> histogram slot for extract_batch(): tracked characters first, then
+# ASCII vowels, other ASCII letters and everything else.
+_SLOT_VOWEL = N_TRACKED_CHARS
+_SLOT_CONSONANT = N_TRACKED_CHARS + 1
+_SLOT_OTHER = N_TRACKED_CHARS + 2
+_N_SLOTS = N_TRACKED_CHARS + 3
+_BYTE_SLOTS = np.full(256, _SLOT_OTHER, dtype=np.intp)
+for _c in string.ascii_letters:
+    _BYTE_SLOTS[ord(_c)] = _SLOT_VOWEL if _c in _VOWELS else _SLOT_CONSONANT
+for _i, _c in enumerate(TRACKED_CHARS):
+    _BYTE_SLOTS[ord(_c)] = _i
+del _c, _i
+
+
+def _as_float(value):
+    """Convert a main() feature value to float like the URL service does.
+
+    '?', None and unparsable values become 0.0; 'True'/'False' become 1.0/0.0.
+    """
+    if value in (None, '?', ''):
+        return 0.0
+    if isinstance(value, str) and value.lower() in ('true', 'false'):
+        return 1.0 if value.lower() == 'true' else 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+# Column index of every feature in a main()/extract_vector() vector.
+VECTOR_INDEX = {name: i for i, name in enumerate(VECTOR_ATTRIBUTES)}
+
+
+def extract_vector(url, tier='full', out=None, probe_overrides=None):
+    """Write the main(url, tier) features as numbers into a float32 array.
+
+    out is a preallocated float32 array of len(VECTOR_ATTRIBUTES) (a new one is
+    allocated when omitted) and is returned. Values equal main() coerced by the
+    URL service ('?' -> 0.0, booleans -> 1.0/0.0), without the string round trip.
+    probe_overrides replaces network probes (see tier_probes).
+    """
+    probes = tier_probes(tier, probe_overrides)
+    if out is None:
+        out = np.empty(len(VECTOR_ATTRIBUTES), dtype=np.float32)
+    k = N_TRACKED_CHARS
+    dict_url = start_url(url)
+    full_url = dict_url['url']
+    host = dict_url['host']
+    path = dict_url['path']
+    query = dict_url['query']
+
+    # URL
+    url_hist = char_histogram(full_url)
+    out[0:k] = url_hist[:k]
+    out[VECTOR_INDEX['count_tld_url']] = count_tld(full_url)
+    out[VECTOR_INDEX['len_url']] = len(full_url)
+    out[VECTOR_INDEX['alpha_url']] = url_hist[LETTERS_INDEX]
+    network = network_features(full_url, probes=probes)
+    for name, _ in NETWORK_PROBES:
+        out[VECTOR_INDEX[name]] = _as_float(network.get(name, NETWORK_IMPUTATION[name]))
+    out[VECTOR_INDEX['Hasshortner_URL']] = shortner_URL(full_url)
+    # DOMAIN
+    col = VECTOR_INDEX['dot_host']
+    host_hist = char_histogram(host)
+    out[col:col + k] = host_hist[:k]
+    out[VECTOR_INDEX['vowels_host']] = host_hist[VOWELS_INDEX]
+    out[VECTOR_INDEX['len_host']] = len(host)
+    out[VECTOR_INDEX['ip_exist']] = valid_ip(host)
+    out[VECTOR_INDEX['server_client']] = check_word_server_client(host)
+    # DIRECTORY + FILE ('?' for a missing path is 0.0)
+    col = VECTOR_INDEX['dot_path']
+    if path:
+        for text in (path, posixpath.basename(path)):
+            out[col:col + k] = char_histogram(text)[:k]
+            out[col + k] = len(text)
+            col += k + 1
+    else:
+        out[col:col + 2 * (k + 1)] = 0.0
+    # PARAMETERS
+    col = VECTOR_INDEX['dot_params']
+    if query:
+        out[col:col + k] = char_histogram(query)[:k]
+        out[VECTOR_INDEX['len_params']] = len(query)
+        out[VECTOR_INDEX['number_params']] = count_params(query)
+    else:
+        out[col:col + k + 2] = 0.0
+    out[VECTOR_INDEX['email_exist']] = valid_email(full_url)
+    return out
+
+
+def batch_char_histograms(texts):
+    """Vectorized char_histogram() over a list of strings.
+
+    All strings are concatenated into one uint8 buffer and binned in a single
+    np.bincount call. Returns an int64 array of shape (len(texts), N_TRACKED_CHARS + 2)
+    with the same columns as char_histogram(); vowels are counted for ASCII only.
+    """
+    encoded = [t.encode('utf-8', 'surrogatepass') for t in texts]
+    sizes = np.fromiter(map(len, encoded), dtype=np.intp, count=len(encoded))
+    flat = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    rows = np.repeat(np.arange(len(encoded), dtype=np.intp), sizes)
+    bins = np.bincount(rows * _N_SLOTS + _BYTE_SLOTS[flat], minlength=len(encoded) * _N_SLOTS)
+    bins = bins.reshape(len(encoded), _N_SLOTS)
+    out = np.empty((len(encoded), N_TRACKED_CHARS + 2), dtype=np.int64)
+    out[:, :N_TRACKED_CHARS] = bins[:, :N_TRACKED_CHARS]
+    out[:, VOWELS_INDEX] = bins[:, _SLOT_VOWEL]
+    out[:, LETTERS_INDEX] = bins[:, _SLOT_VOWEL] + bins[:, _SLOT_CONSONANT]
+    return out
+
+
+def extract_batch(urls, tier='full'):
+    """Extract main() features for many URLs at once.
+
+    Returns a float32 matrix of shape (len(urls), len(VECTOR_ATTRIBUTES)) whose
+    rows equal main(url, tier) coerced to floats ('?' -> 0.0, booleans -> 1.0/0.0).
+    Character counts and lengths for all components are computed vectorized.
+    """
+    probes = tier_probes(tier)
+    parts = [start_url(u) for u in urls]
+    n = len(parts)
+    full_urls = [p['url'] for p in parts]
+    hosts = [p['host'] for p in parts]
+    paths = [p['path'] for p in parts]
+    files = [posixpath.basename(p) for p in paths]
+    queries = [p['query'] for p in parts]
+
+    # one histogram pass over all five components of every URL
+    hist = batch_char_histograms(full_urls + hosts + paths + files + queries)
+    url_hist, host_hist, path_hist, file_hist, query_hist = (hist[i * n:(i + 1) * n] for i in range(5))
+
+    def lengths(texts):
+        return np.fromiter(map(len, texts), dtype=np.float32, count=n)
+
+    def per_url(func, texts):
+        return np.fromiter((_as_float(func(t)) for t in texts), dtype=np.float32, count=n)
+
+    # non-ASCII hosts may contain characters that lowercase to ASCII vowels
+    host_vowels = host_hist[:, VOWELS_INDEX].copy()
+    for i, h in enumerate(hosts):
+        if not h.isascii():
+            host_vowels[i] = char_histogram(h)[VOWELS_INDEX]
+
+    # Empty paths and queries yield zero counts, which matches the coerced '?'.
+    k = N_TRACKED_CHARS
+    X = np.zeros((n, len(VECTOR_ATTRIBUTES)), dtype=np.float32)
+    X[:, 0:k] = url_hist[:, :k]
+    X[:, k] = per_url(count_tld, full_urls)
+    X[:, k + 1] = lengths(full_urls)
+    X[:, k + 2] = url_hist[:, LETTERS_INDEX]
+    network = network_features_batch(full_urls, probes)
+    for j, (name, _) in enumerate(NETWORK_PROBES):
+        X[:, k + 3 + j] = [_as_float(row.get(name, NETWORK_IMPUTATION[name])) for row in network]
+    X[:, k + 6] = per_url(shortner_URL, full_urls)
+    col = k + 7
+    X[:, col:col + k] = host_hist[:, :k]
+    X[:, col + k] = host_vowels
+    X[:, col + k + 1] = lengths(hosts)
+    X[:, col + k + 2] = per_url(valid_ip, hosts)
+    X[:, col + k + 3] = per_url(check_word_server_client, hosts)
+    col += k + 4
+    for comp_hist, texts in ((path_hist, paths), (file_hist, files), (query_hist, queries)):
+        X[:, col:col + k] = comp_hist[:, :k]
+        X[:, col + k] = lengths(texts)
+        col += k + 1
+    X[:, col] = per_url(count_params, queries)
+    X[:, col + 1] = per_url(valid_email, full_urls)
+    return X
@@ -1,31 +1,565 @@
 # filename: url_feature_extractor.py
 
+import codecs
+import hashlib
+import json
+import os
 import re
 import socket
+import time
+import numpy as np
 import requests
-from bs4 import BeautifulSoup
+from html.parser import HTMLParser
 from urllib.parse import urlparse, urljoin
+try:
+    from bs4 import BeautifulSoup
+except Exception:
+    BeautifulSoup = None
 from tld import get_tld
+try:
+    from models import http_client
+except Exception:
+    http_client = requests
+
+# Bump whenever a change alters extracted values; stored feature vectors are
+# keyed by it (see services/feature_store.py).
+FEATURE_VERSION = 2
+
+# Page downloads stop after MAX_PAGE_BYTES of (decompressed) body or
+# PAGE_READ_DEADLINE seconds of reading; features use what was read.
+MAX_PAGE_BYTES = int(os.environ.get('MAX_PAGE_BYTES', 2 * 1024 * 1024))
+PAGE_READ_DEADLINE = float(os.environ.get('PAGE_READ_DEADLINE', 15))
+
+
+class FeatureSchema:
+    """Column layout of a model's feature vector: names, fixed indexes, dtypes.
+
+    Rows are float64 arrays (what the model is fed); a column's dtype records
+    what it holds ('int8' flags, 'int32' counts, 'float64'). version is a
+    hash of the layout, so two schemas with the same version are
+    interchangeable. Models record theirs in a JSON file next to the pickle
+    (save/load).
+    """
+
+    def __init__(self, columns):
+        self.columns = tuple((name, str(np.dtype(dtype))) for name, dtype in columns)
+        self.names = tuple(name for name, _ in self.columns)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        if len(self.index) != len(self.names):
+            raise ValueError('duplicate feature names in schema')
+        layout = json.dumps(self.columns, separators=(',', ':'))
+        self.version = hashlib.sha256(layout.encode()).hexdigest()[:12]
+
+    def __len__(self):
+        return len(self.columns)
+
+    def __eq__(self, other):
+        return isinstance(other, FeatureSchema) and self.columns == other.columns
+
+    def __hash__(self):
+        return hash(self.columns)
+
+    def new_row(self):
+        return np.zeros(len(self.columns), dtype=np.float64)
+
+    def diff(self, other):
+        """Describe how other differs from this schema ('' when equal)."""
+        if self == other:
+            return ''
+        missing = [n for n in self.names if n not in other.index]
+        extra = [n for n in other.names if n not in self.index]
+        if missing or extra:
+            return f'missing columns {missing}, unexpected columns {extra}'
+        moved = [n for n in self.names if self.index[n] != other.index[n]]
+        if moved:
+            return f'columns in a different order: {moved}'
+        retyped = [n for (n, a), (_, b) in zip(self.columns, other.columns) if a != b]
+        return f'columns with different dtypes: {retyped}'
+
+    def to_dict(self):
+        return {'version': self.version, 'columns': [list(c) for c in self.columns]}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['columns'])
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+# The website model's input layout. The order is the sorted order of the
+# extract_model_features() keys that the deployed model was trained on.
+WEBSITE_SCHEMA = FeatureSchema([
+    ('Abnormal_URL', 'int8'),
+    ('DomainLength', 'int32'),
+    ('HasCopyrightInfo', 'int8'),
+    ('HasDescription', 'int8'),
+    ('HasFavicon', 'int8'),
+    ('HasObfuscation', 'int8'),
+    ('HasSocialNet', 'int8'),
+    ('HasSubmitButton', 'int8'),
+    ('HasTitle', 'int8'),
+    ('Iframe', 'int8'),
+    ('IsHTTPS', 'int8'),
+    ('LetterToDigitRatio', 'float64'),
+    ('NoOfCSS', 'int32'),
+    ('NoOfExternalRef', 'int32'),
+    ('NoOfImage', 'int32'),
+    ('NoOfJS', 'int32'),
+    ('NoOfSelfRef', 'int32'),
+    ('Redirect_0', 'int8'),
+    ('Redirect_1', 'int8'),
+    ('TLDLength', 'int32'),
+    ('URLLength', 'int32'),
+    ('popUpWindow', 'int8'),
+])
+
+class _StreamSearch:
+    """Search a text stream for a regex, fed piece by piece.
+
+    A tail of ``carry`` characters is kept between pieces, so matches up to
+    carry + 1 characters long are found across piece boundaries.
+    """
+
+    def __init__(self, pattern, carry, flags=0):
+        self.regex = re.compile(pattern, flags)
+        self.carry = carry
+        self.tail = ''
+        self.found = False
+
+    def feed(self, text):
+        if self.found or not text:
+            return
+        text = self.tail + text
+        if self.regex.search(text):
+            self.found = True
+        self.tail = text[-self.carry:]
+
+    def reset(self):
+        self.tail = ''
+
+
+class RuleMatcher:
+    """A set of named regex rules counted over the same input.
+
+    counts() reports, for every rule, the number of matches re.findall would
+    find for that rule alone: rules are scanned independently, so a match of
+    one rule never hides an overlapping match of another. Each rule is its
+    own compiled pattern, which keeps re's literal-prefix search fast.
+    """
+
+    def __init__(self, rules, flags=0):
+        self.names = tuple(name for name, _ in rules)
+        self._rules = [(name, re.compile(pattern, flags)) for name, pattern in rules]
+
+    def _scan(self, text, hits, starts=None, limit=None):
+        # count the matches of each rule starting at or after starts[name] and
+        # before limit; return, per rule, where its next scan has to start
+        resume = {}
+        for name, regex in self._rules:
+            pos = starts[name] if starts else 0
+            for m in regex.finditer(text, pos):
+                if limit is not None and m.start() >= limit:
+                    break
+                hits[name] += 1
+                # an empty match must not stop the scan at the same position
+                pos = max(m.end(), m.start() + 1)
+            resume[name] = pos
+        return resume
+
+    def counts(self, text):
+        hits = dict.fromkeys(self.names, 0)
+        if text:
+            self._scan(text, hits)
+        return hits
+
+    def stream(self, carry=256):
+        return _RuleStream(self, carry)
+
+
+class _RuleStream:
+    """A RuleMatcher over a text fed piece by piece.
+
+    Matches are counted once they start more than ``carry`` characters before
+    the end of the text seen so far (the rest is kept and scanned with the
+    next piece), so matches up to carry characters long are found across
+    piece boundaries. close() counts the remaining tail.
+    """
+
+    def __init__(self, matcher, carry):
+        self.matcher = matcher
+        self.carry = carry
+        self.tail = ''
+        # per rule, where its scan resumes in tail (past matches already counted)
+        self.starts = dict.fromkeys(matcher.names, 0)
+        self.hits = dict.fromkeys(matcher.names, 0)
+
+    def feed(self, text):
+        if not text:
+            return
+        text = self.tail + text
+        limit = max(0, len(text) - self.carry)
+        resume = self.matcher._scan(text, self.hits, self.starts, limit)
+        self.tail = text[limit:]
+        self.starts = {name: max(0, pos - limit) for name, pos in resume.items()}
+
+    def close(self):
+        self.matcher._scan(self.tail, self.hits, self.starts)
+        self.tail = ''
+        self.starts = dict.fromkeys(self.matcher.names, 0)
+
+
+# searched in the raw page; HasObfuscation is any of the first seven
+OBFUSCATION_RULES = (
+    ('percent_escape', r'%[0-9a-fA-F]{2}'),
+    ('hex_escape', r'\\x[0-9a-fA-F]{2}'),
+    ('hex_entity', r'&#x[0-9a-fA-F]+;'),
+    ('javascript_uri', r'javascript:'),
+    ('eval', r'eval\('),
+    ('document_write', r'document\.write'),
+    ('from_char_code', r'fromCharCode'),
+)
+PAGE_RULES = RuleMatcher(OBFUSCATION_RULES + (('window_open', r'window\.open\s*\('),))
+
+# searched in the URL; Abnormal_URL is any of them
+URL_RULES = RuleMatcher((
+    ('at_sign', r'@'),
+    ('userinfo', r'//\w+@'),
+    ('ip_address', r'\d+\.\d+\.\d+\.\d+'),
+    ('executable_ext', r'\.(exe|zip|rar|dll|js)$'),
+))
+
+
+class PageScanner(HTMLParser):
+    """Compute the page features of extract_model_features in one pass.
+
+    Feed the document in chunks (feed/close), then read features(). Only
+    counters, flags and short search tails are kept, never the document or a
+    tree. The fields match the BeautifulSoup-based definitions:
+
+    - tags are counted as find_all() would (every start tag)
+    - HasSocialNet searches everything soup.decode() would serialize: tag and
+      attribute names, attribute values, text, comments and declarations
+    - HasCopyrightInfo searches the text get_text() returns: all text outside
+      script, style and template elements, concatenated
+    - HasObfuscation and popUpWindow search the raw document, in one scan
+      with PAGE_RULES; rule_hits() has the hit count of each rule
+    """
+
+    REF_TAGS = frozenset(('a', 'link', 'script', 'img'))
+    # elements whose text get_text() leaves out
+    NON_TEXT = frozenset(('script', 'style', 'template'))
+
+    def __init__(self, base_url=None):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.images = self.scripts = self.css = 0
+        self.self_refs = self.external_refs = 0
+        self.title = self.description = self.submit = self.favicon = self.iframe = False
+        self._title_state = None  # None: no title yet, 'open': in the first title, 'done'
+        self._description_seen = False
+        self._non_text_depth = 0
+        self._social = _StreamSearch(r'facebook|twitter|linkedin|instagram|youtube|pinterest', 8, re.I)
+        self._copyright = _StreamSearch(r'copyright|©', 8, re.I)
+        self._rules = PAGE_RULES.stream(256)
+        self._in_text = False
+
+    def feed(self, data):
+        self._rules.feed(data)
+        super().feed(data)
+
+    def close(self):
+        super().close()
+        self._rules.close()
+
+    # -- parser events -----------------------------------------------------
+
+    def _markup(self, *parts):
+        # a new node: text runs never continue across markup
+        self._in_text = False
+        if self._social.found:
+            return
+        self._social.reset()
+        for part in parts:
+            self._social.feed(part)
+            self._social.reset()
+
+    def handle_starttag(self, tag, attrs):
+        attrs_list = attrs
+        attrs = {}
+        for key, value in attrs_list:
+            attrs[key] = '' if value is None else value
+        self._markup(tag, *[x for kv in attrs.items() for x in kv])
+
+        if tag == 'img':
+            self.images += 1
+        elif tag == 'script':
+            self.scripts += 1
+        elif tag == 'link':
+            rel = attrs.get('rel')
+            if rel is not None:
+                if rel == 'stylesheet' or 'stylesheet' in rel.split():
+                    self.css += 1
+                if re.search('icon', rel, re.I):
+                    self.favicon = True
+        elif tag == 'meta':
+            if not self._description_seen and attrs.get('name') == 'description':
+                self._description_seen = True
+                self.description = bool(attrs.get('content', '').strip())
+        elif tag == 'input':
+            if attrs.get('type') == 'submit':
+                self.submit = True
+        elif tag == 'button':
+            self.submit = True
+        elif tag == 'iframe':
+            self.iframe = True
+        elif tag == 'title' and self._title_state is None:
+            self._title_state = 'open'
+
+        if tag in self.REF_TAGS and self.base_url:
+            url = attrs.get('href') or attrs.get('src')
+            if url:
+                full = urljoin(self.base_url, url)
+                if full.startswith(self.base_url):
+                    self.self_refs += 1
+                elif urlparse(full).netloc:
+                    self.external_refs += 1
+
+        if tag in self.NON_TEXT:
+            self._non_text_depth += 1
+
+    def handle_endtag(self, tag):
+        self._markup(tag)
+        if tag == 'title' and self._title_state == 'open':
+            self._title_state = 'done'
+        if tag in self.NON_TEXT and self._non_text_depth:
+            self._non_text_depth -= 1
+
+    def handle_data(self, data):
+        # consecutive data events belong to one text node
+        if not self._in_text:
+            self._social.reset()
+            self._in_text = True
+        self._social.feed(data)
+        if not self._non_text_depth:
+            self._copyright.feed(data)
+        if self._title_state == 'open' and not self.title and data.strip():
+            self.title = True
+
+    def handle_comment(self, data):
+        self._markup(data)
+
+    def handle_decl(self, decl):
+        self._markup(decl)
+
+    def handle_pi(self, data):
+        self._markup(data)
+
+    def unknown_decl(self, data):
+        self._markup(data)
+
+    # -- results -----------------------------------------------------------
+
+    def rule_hits(self):
+        return dict(self._rules.hits)
+
+    def features(self):
+        hits = self._rules.hits
+        return {
+            'NoOfImage': self.images,
+            'NoOfJS': self.scripts,
+            'NoOfCSS': self.css,
+            'NoOfSelfRef': self.self_refs,
+            'NoOfExternalRef': self.external_refs,
+            'HasObfuscation': int(any(hits[name] for name, _ in OBFUSCATION_RULES)),
+            'HasTitle': int(self.title),
+            'HasDescription': int(self.description),
+            'HasSubmitButton': int(self.submit),
+            'HasSocialNet': int(self._social.found),
+            'HasFavicon': int(self.favicon),
+            'HasCopyrightInfo': int(self._copyright.found),
+            'popUpWindow': int(hits['window_open'] > 0),
+            'Iframe': int(self.iframe),
+        }
+
+
+def page_scanner(html, base_url=None, chunk_size=65536):
+    """Run PageScanner over an HTML string and return the closed scanner."""
+    scanner = PageScanner(base_url)
+    for i in range(0, len(html or ''), chunk_size):
+        scanner.feed(html[i:i + chunk_size])
+    scanner.close()
+    return scanner
+
+
+def scan_page(html, base_url=None, chunk_size=65536):
+    """Run PageScanner over an HTML string and return its features()."""
+    return page_scanner(html, base_url, chunk_size).features()
+
+
+def _body_chunks(response, size=65536):
+    # read1() returns whatever one network read brings (up to size) instead of
+    # waiting for a full chunk, so a server trickling bytes cannot stretch a
+    # read past one socket timeout; urllib3 1.x lacks it, and small chunks
+    # keep that wait short there
+    read1 = getattr(getattr(response, 'raw', None), 'read1', None)
+    if read1 is None:
+        yield from response.iter_content(1024)
+        return
+    while True:
+        chunk = read1(size, decode_content=True)
+        if not chunk:
+            return
+        yield chunk
+
+
+def read_body(response, max_bytes=MAX_PAGE_BYTES, deadline=PAGE_READ_DEADLINE):
+    """Read a streamed response body; return (body, truncated).
+
+    Reading stops once max_bytes are read or after deadline seconds (checked
+    after every network read, so it overruns by at most one read timeout),
+    so huge or endless bodies never sit in memory; the connection is then
+    closed.
+    """
+    chunks = []
+    size = 0
+    truncated = False
+    started = time.monotonic()
+    try:
+        for chunk in _body_chunks(response):
+            room = max_bytes - size
+            if len(chunk) >= room:
+                chunks.append(chunk[:room])
+                size += room
+                truncated = True
+                break
+            chunks.append(chunk)
+            size += len(chunk)
+            if time.monotonic() - started > deadline:
+                truncated = True
+                break
+    finally:
+        response.close()
+    return b''.join(chunks), truncated
+
+
+_META_CHARSET = re.compile(rb'''<meta[^>]+charset\s*=\s*["']?\s*([a-zA-Z0-9_:.-]+)''', re.I)
+_BOMS = ((codecs.BOM_UTF8, 'utf-8'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16'))
+
+
+def _known_codec(name):
+    try:
+        codecs.lookup(name)
+        return True
+    except (LookupError, TypeError):
+        return False
+
+
+def detect_charset(content_type, body):
+    """Return the charset of an HTML body.
+
+    Order: charset in the Content-Type header, byte order mark, <meta> charset
+    (or http-equiv) in the first 4 KB, ISO-8859-1 for other text/* (as
+    requests does), else UTF-8.
+    """
+    content_type = content_type or ''
+    match = re.search(r'charset\s*=\s*["\']?([^\s;"\']+)', content_type, re.I)
+    if match and _known_codec(match.group(1)):
+        return match.group(1)
+    for bom, name in _BOMS:
+        if body.startswith(bom):
+            return name
+    match = _META_CHARSET.search(body[:4096])
+    if match:
+        name = match.group(1).decode('ascii', 'ignore')
+        if _known_codec(name):
+            return name
+    if content_type.lower().startswith('text/'):
+        return 'ISO-8859-1'
+    return 'utf-8'
+
+
+def fetch_page(url, timeout=10, max_bytes=MAX_PAGE_BYTES, on_response=None):
+    """Download a page and return it as a page dict.
+
+    Keys: url (as requested), final_url, status, history (URLs of the
+    redirect responses), elapsed (seconds until the final response's
+    headers), encoding, body (bytes, at most max_bytes) and truncated.
+    page_text() decodes it. on_response(response) is called once the headers
+    are in, before the body is read.
+    """
+    headers = {'User-Agent': 'Mozilla/5.0'}
+    response = http_client.get(url, headers=headers, timeout=timeout, stream=True)
+    if on_response is not None:
+        on_response(response)
+    body, truncated = read_body(response, max_bytes)
+    return {
+        'url': url,
+        'final_url': response.url,
+        'status': response.status_code,
+        'history': [r.url for r in response.history],
+        'elapsed': response.elapsed.total_seconds(),
+        'encoding': detect_charset(response.headers.get('Content-Type'), body),
+        'body': body,
+        'truncated': truncated,
+    }
+
+
+def page_text(page):
+    """Decode a page dict's body the way requests' response.text does."""
+    try:
+        return str(page['body'], page.get('encoding') or 'utf-8', errors='replace')
+    except (LookupError, TypeError):
+        return str(page['body'], errors='replace')
+
 
 class URLFeatureExtractor:
-    def __init__(self, url, timeout=10):
+    """Website features of a URL.
+
+    The page is downloaded with fetch_page() unless given: pass ``page`` (a
+    page dict, e.g. from the snapshot store) to extract without a request, or
+    ``fetch`` (called as fetch(url, timeout)) to download some other way.
+    """
+
+    def __init__(self, url, timeout=10, page=None, fetch=None):
         self.url = url
         self.timeout = timeout
         self.parsed_url = self.safe_parse(url)
         self.domain = self.parsed_url.netloc if self.parsed_url else ''
-        self.soup = None
+        self._soup = None
+        self.page = page
         self.page_content = None
-        self.response = None
+        self.page_features = None
+        self.page_rule_hits = None
         self.error = None
 
         try:
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            self.response = requests.get(url, headers=headers, timeout=self.timeout)
-            self.page_content = self.response.text
-            self.soup = BeautifulSoup(self.page_content, 'html.parser')
+            if self.page is None:
+                self.page = (fetch or fetch_page)(url, self.timeout)
+            self.page_content = page_text(self.page)
+            base_url = f"{self.parsed_url.scheme}://{self.parsed_url.netloc}" if self.parsed_url else None
+            scanner = page_scanner(self.page_content, base_url)
+            self.page_features = scanner.features()
+            self.page_rule_hits = scanner.rule_hits()
         except Exception as e:
             self.error = str(e)
 
+    @property
+    def soup(self):
+        # parsed on first use only; the features come from PageScanner
+        if self._soup is None and self.page_content is not None and BeautifulSoup is not None:
+            self._soup = BeautifulSoup(self.page_content, 'html.parser')
+        return self._soup
+
+    def _page(self, name):
+        return self.page_features[name] if self.page_features else 0
+
     def safe_parse(self, url):
         try:
             return urlparse(url)
@@ -54,133 +588,130 @@ class URLFeatureExtractor:
         return digits / len(self.url) if self.url else 0
 
     def get_no_of_images(self):
-        return len(self.soup.find_all('img')) if self.soup else 0
+        return self._page('NoOfImage')
 
     def get_no_of_js(self):
-        return len(self.soup.find_all('script')) if self.soup else 0
+        return self._page('NoOfJS')
 
     def get_no_of_css(self):
-        return len(self.soup.find_all('link', {'rel': 'stylesheet'})) if self.soup else 0
+        return self._page('NoOfCSS')
 
     def get_no_of_self_ref(self):
-        if not self.soup or not self.parsed_url:
-            return 0
-        base_url = f"{self.parsed_url.scheme}://{self.parsed_url.netloc}"
-        count = 0
-        for tag in self.soup.find_all(['a', 'link', 'script', 'img']):
-            url = tag.get('href') or tag.get('src')
-            if url:
-                full = urljoin(base_url, url)
-                if full.startswith(base_url):
-                    count += 1
-        return count
+        return self._page('NoOfSelfRef')
 
     def get_no_of_external_ref(self):
-        if not self.soup or not self.parsed_url:
-            return 0
-        base_url = f"{self.parsed_url.scheme}://{self.parsed_url.netloc}"
-        count = 0
-        for tag in self.soup.find_all(['a', 'link', 'script', 'img']):
-            url = tag.get('href') or tag.get('src')
-            if url:
-                full = urljoin(base_url, url)
-                if not full.startswith(base_url) and urlparse(full).netloc:
-                    count += 1
-        return count
+        return self._page('NoOfExternalRef')
 
     def is_https(self):
         return 1 if self.parsed_url and self.parsed_url.scheme == 'https' else 0
 
     def has_obfuscation(self):
-        if not self.page_content:
-            return 0
-        patterns = [
-            r'%[0-9a-fA-F]{2}', r'\\x[0-9a-fA-F]{2}', r'&#x[0-9a-fA-F]+;',
-            r'javascript:', r'eval\(', r'document\.write', r'fromCharCode'
-        ]
-        return 1 if any(re.search(p, self.page_content) for p in patterns) else 0
+        return self._page('HasObfuscation')
 
     def has_title(self):
-        return 1 if self.soup and self.soup.title and self.soup.title.string.strip() else 0
+        return self._page('HasTitle')
 
     def has_description(self):
-        tag = self.soup.find('meta', attrs={'name': 'description'}) if self.soup else None
-        return 1 if tag and tag.get('content', '').strip() else 0
+        return self._page('HasDescription')
 
     def has_submit_button(self):
-        if not self.soup:
-            return 0
-        return 1 if self.soup.find('input', {'type': 'submit'}) or self.soup.find('button') else 0
+        return self._page('HasSubmitButton')
 
     def has_social_net(self):
-        if not self.soup:
-            return 0
-        return 1 if re.search(r'facebook|twitter|linkedin|instagram|youtube|pinterest', self.soup.decode(), re.I) else 0
+        return self._page('HasSocialNet')
 
     def has_favicon(self):
-        return 1 if self.soup and self.soup.find('link', rel=re.compile('icon', re.I)) else 0
+        return self._page('HasFavicon')
 
     def has_copyright_info(self):
-        if not self.soup:
-            return 0
-        return 1 if re.search(r'copyright|©', self.soup.get_text(), re.I) else 0
+        return self._page('HasCopyrightInfo')
 
     def has_popup_window(self):
-        return 1 if self.page_content and re.search(r'window\.open\s*\(', self.page_content) else 0
+        return self._page('popUpWindow')
 
     def has_iframe(self):
-        return 1 if self.soup and self.soup.find('iframe') else 0
+        return self._page('Iframe')
 
     def is_abnormal_url(self):
         if not self.url:
             return 0
-        patterns = [r'@', r'//\w+@', r'\d+\.\d+\.\d+\.\d+', r'\.(exe|zip|rar|dll|js)$']
-        return 1 if any(re.search(p, self.url) for p in patterns) else 0
+        return 1 if any(URL_RULES.counts(self.url).values()) else 0
+
+    def get_rule_hits(self):
+        """Hit count of every page rule (PAGE_RULES) and URL rule (URL_RULES)."""
+        hits = dict.fromkeys(PAGE_RULES.names, 0)
+        if self.page_rule_hits:
+            hits.update(self.page_rule_hits)
+        hits.update(URL_RULES.counts(self.url or ''))
+        return hits
 
     def get_redirect_value(self):
-        if not self.response:
+        # 0 when there is no successful (status < 400) response
+        if not self.page or self.page['status'] >= 400:
             return 0
-        return 1 if len(self.response.history)>0 else -1
-        
+        return 1 if len(self.page['history'])>0 else -1
 
-    def extract_model_features(self):
-        if self.error:
-            return {"error": self.error}
+    # Redirect_0/Redirect_1 encode get_redirect_value(): 0 -> (1, 0),
+    # 1 -> (0, 1), -1 -> (0, 0)
+    def get_redirect_0(self):
+        return 1 if self.get_redirect_value() == 0 else 0
 
-        redirect_value = self.get_redirect_value()
+    def get_redirect_1(self):
+        return 1 if self.get_redirect_value() == 1 else 0
 
-        # Map according to your rule
-        if redirect_value == -1:
-            redirect_0 = 0
-            redirect_1 = 0
-        elif redirect_value == 0:
-            redirect_0 = 1
-            redirect_1 = 0
-        elif redirect_value == 1:
-            redirect_0 = 0
-            redirect_1 = 1
+    def get_letter_to_digit_ratio(self):
+        return self.get_letter_ratio_in_url() / (self.get_digit_ratio_in_url() + 1e-5)
 
-        return {
-            'URLLength': self.get_url_length(),
-            'DomainLength': self.get_domain_length(),
-            'TLDLength': self.get_tld_length(),
-            'NoOfImage': self.get_no_of_images(),
-            'NoOfJS': self.get_no_of_js(),
-            'NoOfCSS': self.get_no_of_css(),
-            'NoOfSelfRef': self.get_no_of_self_ref(),
-            'NoOfExternalRef': self.get_no_of_external_ref(),
-            'IsHTTPS': self.is_https(),
-            'HasObfuscation': self.has_obfuscation(),
-            'HasTitle': self.has_title(),
-            'HasDescription': self.has_description(),
-            'HasSubmitButton': self.has_submit_button(),
-            'HasSocialNet': self.has_social_net(),
-            'HasFavicon': self.has_favicon(),
-            'HasCopyrightInfo': self.has_copyright_info(),
-            'popUpWindow': self.has_popup_window(),
-            'Iframe': self.has_iframe(),
-            'Abnormal_URL': self.is_abnormal_url(),
-            'LetterToDigitRatio': self.get_letter_ratio_in_url() / (self.get_digit_ratio_in_url() + 1e-5),
-            'Redirect_0': redirect_0,
-            'Redirect_1': redirect_1
-        }
\ No newline at end of file
+    # model feature -> method computing it
+    FEATURE_GETTERS = (
+        ('URLLength', 'get_url_length'),
+        ('DomainLength', 'get_domain_length'),
+        ('TLDLength', 'get_tld_length'),
+        ('NoOfImage', 'get_no_of_images'),
+        ('NoOfJS', 'get_no_of_js'),
+        ('NoOfCSS', 'get_no_of_css'),
+        ('NoOfSelfRef', 'get_no_of_self_ref'),
+        ('NoOfExternalRef', 'get_no_of_external_ref'),
+        ('IsHTTPS', 'is_https'),
+        ('HasObfuscation', 'has_obfuscation'),
+        ('HasTitle', 'has_title'),
+        ('HasDescription', 'has_description'),
+        ('HasSubmitButton', 'has_submit_button'),
+        ('HasSocialNet', 'has_social_net'),
+        ('HasFavicon', 'has_favicon'),
+        ('HasCopyrightInfo', 'has_copyright_info'),
+        ('popUpWindow', 'has_popup_window'),
+        ('Iframe', 'has_iframe'),
+        ('Abnormal_URL', 'is_abnormal_url'),
+        ('LetterToDigitRatio', 'get_letter_to_digit_ratio'),
+        ('Redirect_0', 'get_redirect_0'),
+        ('Redirect_1', 'get_redirect_1'),
+    )
+    _row_plans = {}
+
+    @classmethod
+    def _row_plan(cls, schema):
+        # (column index, getter) per schema column, built once per schema;
+        # a column the extractor cannot compute raises KeyError
+        plan = cls._row_plans.get(schema.version)
+        if plan is None:
+            getters = dict(cls.FEATURE_GETTERS)
+            plan = [(schema.index[name], getattr(cls, getters[name])) for name in schema.names]
+            cls._row_plans[schema.version] = plan
+        return plan
+
+    def write_row(self, row, schema=WEBSITE_SCHEMA):
+        """Write the model features into row (from schema.new_row()).
+
+        Raises RuntimeError when the page could not be fetched or parsed.
+        """
+        if self.error:
+            raise RuntimeError(self.error)
+        for i, getter in self._row_plan(schema):
+            row[i] = getter(self)
+        return row
+
+    def extract_model_features(self):
+        if self.error:
+            return {"error": self.error}
+        return {name: getattr(self, getter)() for name, getter in self.FEATURE_GETTERS}
\ No newline at end of file
@@ -0,0 +1,132 @@
+"""Build a phishing URL feature dataset from a URL list.
+
+Streams the input file (one URL per line), extracts features for fixed-size
+shards of URLs across a process pool and writes one file per shard:
+
+  <out>/columns.txt             feature names (attributes() order, one per line)
+  <out>/manifest.json           settings the shards were built with
+  <out>/shard_00000.npy         float32 matrix, one row per URL
+  <out>/shard_00000.urls.txt    the URLs of that shard, in row order
+
+A shard file is only written once complete (tmp file + rename), so an
+interrupted run resumes where it stopped: re-run the same command and
+finished shards are skipped.
+
+Usage:
+  python scripts/build_url_dataset.py urls.txt out_dir [--shard-size 5000]
+      [--workers 4] [--tier full] [--format npy|parquet]
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import numpy as np
+from models.phishing_url import feature_extraction as fe
+
+
+def iter_shards(path, shard_size):
+    """Yield (index, urls) for consecutive shards without reading the whole file."""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        urls = (line.strip() for line in f)
+        urls = (u for u in urls if u)
+        for index in itertools.count():
+            chunk = list(itertools.islice(urls, shard_size))
+            if not chunk:
+                return
+            yield index, chunk
+
+
+def shard_path(out_dir, index, fmt):
+    ext = 'parquet' if fmt == 'parquet' else 'npy'
+    return os.path.join(out_dir, f'shard_{index:05d}.{ext}')
+
+
+def build_shard(out_dir, index, urls, tier, fmt):
+    """Extract one shard and write it atomically; return (index, rows)."""
+    X = fe.extract_batch(urls, tier=tier)
+    target = shard_path(out_dir, index, fmt)
+    tmp = target + '.tmp'
+    if fmt == 'parquet':
+        import pandas as pd
+        df = pd.DataFrame(X, columns=fe.VECTOR_ATTRIBUTES)
+        df.insert(0, 'url', urls)
+        df.to_parquet(tmp, index=False)
+    else:
+        with open(tmp, 'wb') as fh:
+            np.save(fh, X)
+        urls_tmp = os.path.join(out_dir, f'shard_{index:05d}.urls.txt.tmp')
+        with open(urls_tmp, 'w', encoding='utf-8') as fh:
+            fh.write('\n'.join(urls) + '\n')
+        os.replace(urls_tmp, urls_tmp[:-4])
+    # the shard file itself is the checkpoint, so it is renamed last
+    os.replace(tmp, target)
+    return index, len(urls)
+
+
+def _check_manifest(out_dir, settings):
+    path = os.path.join(out_dir, 'manifest.json')
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as fh:
+            previous = json.load(fh)
+        if previous != settings:
+            raise SystemExit(f'{out_dir} was built with different settings: {previous}')
+        return
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump(settings, fh, indent=2)
+    with open(os.path.join(out_dir, 'columns.txt'), 'w', encoding='utf-8') as fh:
+        fh.write('\n'.join(fe.VECTOR_ATTRIBUTES) + '\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build a phishing URL feature dataset.')
+    parser.add_argument('urls', help='text file with one URL per line')
+    parser.add_argument('out_dir', help='output directory (reused to resume)')
+    parser.add_argument('--shard-size', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--tier', choices=fe.EXTRACTION_TIERS, default='full')
+    parser.add_argument('--format', choices=('npy', 'parquet'), default='npy')
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    _check_manifest(args.out_dir, {
+        'input': os.path.abspath(args.urls),
+        'shard_size': args.shard_size,
+        'tier': args.tier,
+        'format': args.format,
+        'feature_version': fe.FEATURE_VERSION,
+        'columns': len(fe.VECTOR_ATTRIBUTES),
+    })
+
+    done = skipped = 0
+    pending = set()
+    # keep at most two shards per worker in flight so the input is streamed
+    max_pending = 2 * args.workers
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for index, urls in iter_shards(args.urls, args.shard_size):
+            if os.path.exists(shard_path(args.out_dir, index, args.format)):
+                skipped += 1
+                continue
+            if len(pending) >= max_pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    i, rows = future.result()
+                    done += 1
+                    print(f'shard {i:05d}: {rows} URLs')
+            pending.add(pool.submit(build_shard, args.out_dir, index, urls, args.tier, args.format))
+        for future in pending:
+            i, rows = future.result()
+            done += 1
+            print(f'shard {i:05d}: {rows} URLs')
+
+    print(f'Built {done} shard(s), {skipped} already complete, in {args.out_dir}')
+
+
+if __name__ == '__main__':
+    main()
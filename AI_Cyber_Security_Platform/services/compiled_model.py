@@ -0,0 +1,520 @@
+"""NumPy-only scorers for the fitted sklearn models the services deploy.
+
+compile_model() turns a supported estimator or pipeline into a CompiledModel
+that reads the fitted arrays once and scores with plain NumPy, skipping the
+per-call validation and dispatch of sklearn (most of the cost of a one-row
+request). Supported:
+
+- text steps: CountVectorizer, TfidfVectorizer, TfidfTransformer (word
+  analyzer with the default preprocessor and tokenizer)
+- scalers: StandardScaler, MinMaxScaler; resamplers (SMOTE, ...) are skipped
+  as they are at predict time
+- linear classifiers (LogisticRegression, LinearSVC, SGDClassifier, ...),
+  MultinomialNB
+- DecisionTreeClassifier, RandomForestClassifier, ExtraTreesClassifier and
+  binary GradientBoostingClassifier
+
+A compiled model is only returned after it reproduced the original's outputs
+on a sample input; any call the compiled path cannot handle goes to the
+original estimator. Set COMPILED_MODELS=0 to always use sklearn.
+"""
+import itertools
+import os
+import re
+
+import numpy as np
+
+ENABLED = os.environ.get('COMPILED_MODELS', '1') != '0'
+
+
+class Unsupported(Exception):
+    """The estimator (or this input) cannot be scored by the compiled path."""
+
+
+class _Csr:
+    """Minimal CSR matrix: the output of the text steps."""
+
+    def __init__(self, indptr, indices, data, n_cols):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.n_cols = n_cols
+
+    @property
+    def n_rows(self):
+        return len(self.indptr) - 1
+
+    def rows(self):
+        return np.repeat(np.arange(self.n_rows), np.diff(self.indptr))
+
+    def dot(self, W):
+        """Return self @ W.T for a dense (k, n_cols) weight matrix."""
+        rows = self.rows()
+        out = np.empty((self.n_rows, W.shape[0]))
+        for k in range(W.shape[0]):
+            out[:, k] = np.bincount(rows, weights=self.data * W[k, self.indices], minlength=self.n_rows)
+        return out
+
+
+def _dense(X, n_features):
+    """Validate a dense input; float32 stays float32, as sklearn keeps it."""
+    if isinstance(X, _Csr):
+        raise Unsupported('sparse input')
+    X = np.asarray(X)
+    if X.dtype != np.float32:
+        X = X.astype(np.float64)
+    if X.ndim != 2 or (n_features is not None and X.shape[1] != n_features):
+        raise Unsupported('unexpected input shape')
+    return X
+
+
+# -- transform steps ---------------------------------------------------------
+
+def _text_step(vect):
+    if getattr(vect, 'analyzer', 'word') != 'word' or vect.tokenizer is not None \
+            or vect.preprocessor is not None or vect.strip_accents is not None:
+        raise Unsupported('custom text analysis')
+    if getattr(vect, 'input', 'content') != 'content':
+        raise Unsupported('file input')
+    token_re = re.compile(vect.token_pattern)
+    if token_re.groups > 1:
+        raise Unsupported('token pattern with several groups')
+    vocabulary = vect.vocabulary_
+    lowercase = vect.lowercase
+    binary = vect.binary
+    lo, hi = vect.ngram_range
+    stop = vect.get_stop_words()
+    stop = frozenset(stop) if stop else None
+    n_cols = len(vocabulary)
+
+    def tokens(doc):
+        if lowercase:
+            doc = doc.lower()
+        words = token_re.findall(doc)
+        if stop:
+            words = [w for w in words if w not in stop]
+        if (lo, hi) == (1, 1):
+            return words
+        grams = list(words) if lo == 1 else []
+        for n in range(max(2, lo), hi + 1):
+            grams.extend(' '.join(words[i:i + n]) for i in range(len(words) - n + 1))
+        return grams
+
+    def transform(docs):
+        if isinstance(docs, str):
+            raise Unsupported('a single string is not a list of documents')
+        indptr = [0]
+        indices = []
+        data = []
+        for doc in docs:
+            if not isinstance(doc, str):
+                raise Unsupported('non-string document')
+            counts = {}
+            for t in tokens(doc):
+                j = vocabulary.get(t)
+                if j is not None:
+                    counts[j] = counts.get(j, 0) + 1
+            for j in sorted(counts):
+                indices.append(j)
+                data.append(1 if binary else counts[j])
+            indptr.append(len(indices))
+        return _Csr(np.asarray(indptr, dtype=np.int64), np.asarray(indices, dtype=np.int64),
+                    np.asarray(data, dtype=np.float64), n_cols)
+    return transform
+
+
+def _idf_vector(step):
+    idf = getattr(step, '_idf_diag', None)
+    if idf is not None:
+        # older pickles keep idf as a sparse diagonal matrix
+        return np.asarray(idf.diagonal(), dtype=np.float64)
+    return np.asarray(step.idf_, dtype=np.float64)
+
+
+def _tfidf_step(step):
+    use_idf = step.use_idf
+    idf = _idf_vector(step) if use_idf else None
+    sublinear = step.sublinear_tf
+    norm = step.norm
+    if norm not in ('l1', 'l2', None):
+        raise Unsupported('tf-idf norm')
+
+    def transform(X):
+        if not isinstance(X, _Csr):
+            raise Unsupported('tf-idf expects counts')
+        data = X.data.copy()
+        if sublinear:
+            data = np.log(data) + 1
+        if use_idf:
+            data *= idf[X.indices]
+        if norm:
+            rows = X.rows()
+            if norm == 'l2':
+                norms = np.sqrt(np.bincount(rows, weights=data * data, minlength=X.n_rows))
+            else:
+                norms = np.bincount(rows, weights=np.abs(data), minlength=X.n_rows)
+            norms[norms == 0.0] = 1.0
+            data /= norms[rows]
+        return _Csr(X.indptr, X.indices, data, X.n_cols)
+    return transform
+
+
+# float32 inputs: depending on the estimator (and sklearn version) the fitted
+# parameters are cast to float32 first (native=True), or the math runs in
+# float64 (native=False: scalers apply float64 parameters in place on the
+# float32 copy, estimators upcast the input). compile_model() tries both.
+
+def _params(*arrays):
+    """Return {dtype: arrays} with the parameters cast to either float dtype."""
+    return {dtype: [None if a is None else np.asarray(a, dtype=dtype) for a in arrays]
+            for dtype in (np.dtype(np.float64), np.dtype(np.float32))}
+
+
+_FLOAT64 = np.dtype(np.float64)
+
+
+def _standard_scaler_step(step, native):
+    params = _params(step.mean_ if step.with_mean else None, step.scale_ if step.with_std else None)
+    n = getattr(step, 'n_features_in_', None)
+
+    def transform(X):
+        X = _dense(X, n).copy()
+        mean, scale = params[X.dtype if native else _FLOAT64]
+        if mean is not None:
+            X -= mean
+        if scale is not None:
+            X /= scale
+        return X
+    return transform
+
+
+def _minmax_scaler_step(step, native):
+    params = _params(step.scale_, step.min_)
+    n = getattr(step, 'n_features_in_', None)
+    lo, hi = step.feature_range
+    clip = getattr(step, 'clip', False)
+
+    def transform(X):
+        X = _dense(X, n).copy()
+        scale, offset = params[X.dtype if native else _FLOAT64]
+        X *= scale
+        X += offset
+        if clip:
+            X = np.clip(X, lo, hi)
+        return X
+    return transform
+
+
+def _compile_transform(step, native):
+    name = type(step).__name__
+    if name in ('CountVectorizer', 'TfidfVectorizer'):
+        counts = _text_step(step)
+        if name == 'CountVectorizer':
+            return counts, True
+        tfidf = _tfidf_step(step._tfidf if hasattr(step, '_tfidf') else step)
+        return (lambda docs: tfidf(counts(docs))), True
+    if name == 'TfidfTransformer':
+        return _tfidf_step(step), True
+    if name == 'StandardScaler':
+        return _standard_scaler_step(step, native), False
+    if name == 'MinMaxScaler':
+        return _minmax_scaler_step(step, native), False
+    raise Unsupported(name)
+
+
+# -- final estimators ----------------------------------------------------------
+# Each returns (decision, proba): functions of the transformed input, or None.
+
+def _softmax(z):
+    z = z - z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+def _sigmoid_pair(d):
+    p = 1.0 / (1.0 + np.exp(-d))
+    return np.column_stack([1.0 - p, p])
+
+
+def _linear(est, native):
+    coef = np.asarray(est.coef_, dtype=np.float64)
+    intercept = np.asarray(est.intercept_, dtype=np.float64)
+    if hasattr(coef, 'toarray'):
+        raise Unsupported('sparse coefficients')
+    n = coef.shape[1]
+    params = _params(coef, intercept)
+
+    def decision(X):
+        if isinstance(X, _Csr):
+            return X.dot(coef) + intercept
+        X = _dense(X, n)
+        if not native:
+            X = X.astype(np.float64, copy=False)
+        W, b = params[X.dtype]
+        return X @ W.T + b
+
+    name = type(est).__name__
+    proba = None
+    if name == 'LogisticRegression' or (name == 'SGDClassifier' and est.loss in ('log', 'log_loss')):
+        if coef.shape[0] == 1:
+            def proba(X):
+                return _sigmoid_pair(decision(X)[:, 0])
+        elif name == 'LogisticRegression':
+            def proba(X):
+                return _softmax(decision(X))
+    return decision, proba
+
+
+def _multinomial_nb(est, native):
+    flp = np.asarray(est.feature_log_prob_, dtype=np.float64)
+    prior = np.asarray(est.class_log_prior_, dtype=np.float64)
+    n = flp.shape[1]
+    params = _params(flp, prior)
+
+    def decision(X):
+        if isinstance(X, _Csr):
+            return X.dot(flp) + prior
+        X = _dense(X, n)
+        if not native:
+            X = X.astype(np.float64, copy=False)
+        W, b = params[X.dtype]
+        return X @ W.T + b
+
+    def proba(X):
+        return _softmax(decision(X))
+    return decision, proba
+
+
+def _flatten_trees(trees):
+    """Concatenate fitted trees into flat node arrays with global child ids."""
+    left, right, feature, threshold, value, roots = [], [], [], [], [], []
+    offset = 0
+    depth = 0
+    for tree in trees:
+        t = tree.tree_
+        l = t.children_left.astype(np.int64)
+        r = t.children_right.astype(np.int64)
+        leaf = l == -1
+        left.append(np.where(leaf, np.arange(t.node_count) + offset, l + offset))
+        right.append(np.where(leaf, np.arange(t.node_count) + offset, r + offset))
+        feature.append(np.where(leaf, 0, t.feature).astype(np.int64))
+        threshold.append(t.threshold.astype(np.float64))
+        value.append(t.value[:, 0, :].astype(np.float64))
+        roots.append(offset)
+        offset += t.node_count
+        depth = max(depth, t.max_depth)
+    return (np.concatenate(left), np.concatenate(right), np.concatenate(feature),
+            np.concatenate(threshold), np.concatenate(value), np.asarray(roots), depth)
+
+
+def _tree_leaves(flat, n):
+    """Return a function mapping X to the (n_samples, n_trees) leaf node ids.
+
+    Leaves point to themselves, so walking max_depth steps from every root
+    lands each sample on its leaf in all trees at once.
+    """
+    left, right, feature, threshold, _, roots, depth = flat
+
+    def leaves(X):
+        # trees compare float32 inputs, as sklearn does
+        X = _dense(X, n).astype(np.float32)
+        rows = np.arange(X.shape[0])[:, None]
+        node = np.broadcast_to(roots, (X.shape[0], len(roots))).copy()
+        for _ in range(depth):
+            go_left = X[rows, feature[node]] <= threshold[node]
+            node = np.where(go_left, left[node], right[node])
+        return node
+    return leaves
+
+
+def _forest(est):
+    trees = est.estimators_ if hasattr(est, 'estimators_') else [est]
+    flat = _flatten_trees(trees)
+    value = flat[4]
+    totals = value.sum(axis=1, keepdims=True)
+    totals[totals == 0.0] = 1.0
+    value = value / totals
+    leaves = _tree_leaves(flat, getattr(est, 'n_features_in_', None))
+    if value.shape[1] != len(est.classes_):
+        raise Unsupported('multi-output trees')
+
+    def proba(X):
+        return value[leaves(X)].mean(axis=1)
+    return None, proba
+
+
+def _gradient_boosting(est):
+    if est.estimators_.shape[1] != 1:
+        raise Unsupported('multiclass gradient boosting')
+    n = est.n_features_in_
+    # the initial estimator (class prior) gives the same raw score for every row
+    init = float(est._raw_predict_init(np.zeros((1, n), dtype=np.float32))[0, 0])
+    flat = _flatten_trees(est.estimators_[:, 0])
+    value = flat[4][:, 0] * est.learning_rate
+    leaves = _tree_leaves(flat, n)
+
+    def decision(X):
+        return (init + value[leaves(X)].sum(axis=1))[:, None]
+
+    def proba(X):
+        return _sigmoid_pair(decision(X)[:, 0])
+    return decision, proba
+
+
+_LINEAR = ('LogisticRegression', 'LinearSVC', 'SGDClassifier', 'RidgeClassifier', 'Perceptron',
+           'PassiveAggressiveClassifier')
+_TREES = ('DecisionTreeClassifier', 'RandomForestClassifier', 'ExtraTreesClassifier')
+
+
+def _compile_estimator(est, sparse, native):
+    name = type(est).__name__
+    if name in _LINEAR:
+        return _linear(est, native)
+    if name == 'MultinomialNB':
+        return _multinomial_nb(est, native)
+    if name in _TREES and not sparse:
+        return _forest(est)
+    if name == 'GradientBoostingClassifier' and not sparse:
+        return _gradient_boosting(est)
+    raise Unsupported(name)
+
+
+class CompiledModel:
+    """Drop-in scorer exposing the original's predict/decision_function API.
+
+    Calls the compiled path cannot handle are sent to ``original``.
+    """
+
+    def __init__(self, original, transforms, decision, proba):
+        self.original = original
+        self.classes_ = np.asarray(original.classes_)
+        self._transforms = transforms
+        self._decision = decision
+        self._proba = proba
+
+    def __getattr__(self, name):
+        # anything not compiled (n_features_in_, predict_proba of some models, ...)
+        if name == 'original':
+            raise AttributeError(name)
+        return getattr(self.original, name)
+
+    def _transform(self, X):
+        for t in self._transforms:
+            X = t(X)
+        return X
+
+    def _fast_predict(self, X):
+        Z = self._transform(X)
+        if self._proba is not None and self._decision is None:
+            return self.classes_[self._proba(Z).argmax(axis=1)]
+        d = self._decision(Z)
+        if d.shape[1] == 1:
+            return self.classes_[(d[:, 0] > 0).astype(int)]
+        return self.classes_[d.argmax(axis=1)]
+
+    def predict(self, X):
+        try:
+            return self._fast_predict(X)
+        except Unsupported:
+            return self.original.predict(X)
+
+    @property
+    def decision_function(self):
+        # only offered where the original has one (MultinomialNB has not), so
+        # hasattr() answers the same for the compiled and the original model
+        if not hasattr(self.original, 'decision_function'):
+            raise AttributeError('decision_function')
+        return self._decision_function
+
+    def _decision_function(self, X):
+        if self._decision is None:
+            return self.original.decision_function(X)
+        try:
+            d = self._decision(self._transform(X))
+        except Unsupported:
+            return self.original.decision_function(X)
+        return d[:, 0] if d.shape[1] == 1 else d
+
+
+class CompiledProbModel(CompiledModel):
+    """CompiledModel for estimators that also provide predict_proba."""
+
+    def predict_proba(self, X):
+        try:
+            return self._proba(self._transform(X))
+        except Unsupported:
+            return self.original.predict_proba(X)
+
+
+def _steps(model):
+    return model.steps if hasattr(model, 'steps') else [(None, model)]
+
+
+def _build(model, native):
+    """Compile every step; ``native`` holds one float32 flag per step."""
+    steps = _steps(model)
+    transforms = []
+    sparse = False
+    for (_, step), step_native in zip(steps[:-1], native):
+        if step is None or step == 'passthrough' or hasattr(step, 'fit_resample'):
+            # resamplers only act during fit
+            continue
+        transform, sparse_out = _compile_transform(step, step_native)
+        if sparse and not sparse_out:
+            raise Unsupported('dense step after sparse features')
+        sparse = sparse_out
+        transforms.append(transform)
+    decision, proba = _compile_estimator(steps[-1][1], sparse, native[-1])
+    # mirror the original: predict_proba exists only when the model has it
+    if proba is not None and hasattr(model, 'predict_proba'):
+        return CompiledProbModel(model, transforms, decision, proba)
+    if decision is None:
+        raise Unsupported('no decision function')
+    return CompiledModel(model, transforms, decision, None)
+
+
+def _same(a, b):
+    a = np.asarray(a)
+    b = np.asarray(b)
+    if a.shape != b.shape:
+        return False
+    if np.float32 in (a.dtype, b.dtype):
+        # float32 sums differ by summation order alone (BLAS vs NumPy), by
+        # up to a few ulps of the largest value
+        scale = max(1.0, float(np.abs(b).max(initial=0.0)))
+        return np.allclose(a, b, rtol=1e-5, atol=1e-5 * scale)
+    if a.dtype.kind in 'fc' or b.dtype.kind in 'fc':
+        return np.allclose(a, b, rtol=1e-6, atol=1e-9)
+    return bool((a == b).all())
+
+
+def compile_model(model, sample):
+    """Return a CompiledModel for ``model``, or ``model`` itself.
+
+    The compiled model must reproduce predict (and predict_proba /
+    decision_function where present) on ``sample``; otherwise, or when the
+    estimator is unsupported, the original is returned unchanged.
+    """
+    if not ENABLED or model is None:
+        return model
+    # the first float32 handling (see _params) that reproduces the original wins
+    for native in itertools.product((True, False), repeat=len(_steps(model))):
+        try:
+            compiled = _build(model, native)
+            if _reproduces(compiled, model, sample):
+                return compiled
+        except Exception:
+            continue
+    return model
+
+
+def _reproduces(compiled, model, sample):
+    if not _same(compiled._fast_predict(sample), model.predict(sample)):
+        return False
+    if isinstance(compiled, CompiledProbModel):
+        if not _same(compiled._proba(compiled._transform(sample)), model.predict_proba(sample)):
+            return False
+    if compiled._decision is not None and hasattr(model, 'decision_function'):
+        if not _same(compiled.decision_function(sample), model.decision_function(sample)):
+            return False
+    return True
@@ -0,0 +1,157 @@
+"""Concurrent page fetching for bulk website jobs.
+
+crawl() downloads many URLs at once on an asyncio event loop. The fetch
+function itself stays blocking (fetch_page or the snapshot store, both on the
+pooled HTTP session) and runs on a thread pool; the loop decides what may run:
+
+- at most CRAWL_CONCURRENCY fetches in flight overall,
+- at most CRAWL_PER_HOST in flight per host, so one slow or rate-limiting
+  site cannot take every slot and no site sees a burst of requests,
+- a fetch that raises or returns a retryable status (429, 5xx) is tried
+  again up to CRAWL_RETRIES times, CRAWL_BACKOFF * 2**n seconds apart
+  (with refetch, if given, so a cache in front of the download cannot hand
+  back the failed response),
+- after CRAWL_DEADLINE seconds every URL still pending is given up and
+  reported with a TimeoutError (a download already running on a thread ends
+  on its own HTTP timeout).
+
+Results are yielded as (url, page, error) in completion order, so callers can
+extract features from one page while the others are still downloading.
+"""
+import asyncio
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+CONCURRENCY = int(os.environ.get('CRAWL_CONCURRENCY', 16))
+PER_HOST = int(os.environ.get('CRAWL_PER_HOST', 2))
+RETRIES = int(os.environ.get('CRAWL_RETRIES', 1))
+BACKOFF = float(os.environ.get('CRAWL_BACKOFF', 0.5))
+DEADLINE = float(os.environ.get('CRAWL_DEADLINE', 300))
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def _host(url):
+    try:
+        return (urlsplit(url).hostname or '').lower()
+    except ValueError:
+        return ''
+
+
+def _should_retry(page, error):
+    if error is not None:
+        return True
+    return isinstance(page, dict) and page.get('status') in RETRY_STATUSES
+
+
+async def _fetch(url, fetch, refetch, pool, limit, host_limit, retries, backoff):
+    loop = asyncio.get_running_loop()
+    attempt = 0
+    while True:
+        get = fetch if attempt == 0 else refetch
+        # the host slot is taken first so URLs queued behind a busy host do
+        # not hold global slots other hosts could use
+        async with host_limit:
+            async with limit:
+                try:
+                    page, error = await loop.run_in_executor(pool, get, url), None
+                except Exception as e:
+                    page, error = None, e
+        if attempt >= retries or not _should_retry(page, error):
+            return url, page, error
+        await asyncio.sleep(backoff * 2 ** attempt)
+        attempt += 1
+
+
+async def crawl_async(urls, fetch, concurrency=None, per_host=None, retries=None,
+                      deadline=None, backoff=None, refetch=None):
+    """Fetch urls with fetch(url), yielding (url, page, error) as each finishes.
+
+    Retries call refetch(url) instead (fetch by default). error is None
+    whenever a page came back, even one whose status was still retryable
+    when the retries ran out; otherwise page is None.
+    """
+    concurrency = concurrency or CONCURRENCY
+    per_host = per_host or PER_HOST
+    retries = RETRIES if retries is None else retries
+    deadline = DEADLINE if deadline is None else deadline
+    backoff = BACKOFF if backoff is None else backoff
+    refetch = refetch or fetch
+
+    loop = asyncio.get_running_loop()
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='crawl')
+    limit = asyncio.Semaphore(concurrency)
+    host_limits = {}
+    tasks = {}
+    for url in urls:
+        host = _host(url)
+        if host not in host_limits:
+            host_limits[host] = asyncio.Semaphore(per_host)
+        task = asyncio.ensure_future(
+            _fetch(url, fetch, refetch, pool, limit, host_limits[host], retries, backoff))
+        tasks[task] = url
+
+    end = loop.time() + deadline if deadline else None
+    pending = set(tasks)
+    try:
+        while pending:
+            timeout = None if end is None else max(0.0, end - loop.time())
+            done, pending = await asyncio.wait(
+                pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for task in done:
+                yield task.result()
+        for task in pending:
+            task.cancel()
+            yield tasks[task], None, TimeoutError('crawl deadline exceeded')
+    finally:
+        for task in tasks:
+            task.cancel()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def crawl(urls, fetch, **options):
+    """Blocking form of crawl_async() for synchronous callers.
+
+    The event loop runs on a background thread; results are handed over as
+    they complete, and closing the generator early stops the crawl.
+    """
+    results = queue.Queue()
+    finished = object()
+    state = {}
+
+    async def drain():
+        state['task'] = asyncio.current_task()
+        state['loop'] = asyncio.get_running_loop()
+        async for item in crawl_async(list(urls), fetch, **options):
+            results.put(item)
+
+    def run():
+        try:
+            asyncio.run(drain())
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            state['error'] = e
+        finally:
+            results.put(finished)
+
+    thread = threading.Thread(target=run, name='crawler', daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = results.get()
+            if item is finished:
+                break
+            yield item
+        if 'error' in state:
+            raise state['error']
+    finally:
+        if thread.is_alive() and 'loop' in state:
+            try:
+                state['loop'].call_soon_threadsafe(state['task'].cancel)
+            except RuntimeError:
+                pass
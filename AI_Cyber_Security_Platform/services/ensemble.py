@@ -1,7 +1,28 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 from . import phishing_url_service
 from . import phishing_website_service
 
-def _label_from_text(text: str):
+# runs the two detectors of each ensemble request side by side
+_POOL = ThreadPoolExecutor(max_workers=int(os.environ.get('ENSEMBLE_WORKERS', 16)),
+                           thread_name_prefix='ensemble')
+
+# 'parallel' runs both detectors on every URL; 'cascade' scores the URL
+# lexically first and only fetches the site when the URL model's probability
+# falls between ENSEMBLE_CASCADE_LOW and ENSEMBLE_CASCADE_HIGH, or when no
+# model probability is available
+ENSEMBLE_MODES = ('parallel', 'cascade')
+DEFAULT_MODE = os.environ.get('ENSEMBLE_MODE', 'parallel')
+CASCADE_LOW = float(os.environ.get('ENSEMBLE_CASCADE_LOW', 0.2))
+CASCADE_HIGH = float(os.environ.get('ENSEMBLE_CASCADE_HIGH', 0.8))
+
+
+def _label_from_text(text):
+    # the URL detector returns a dict with a label, the website detector text
+    if isinstance(text, dict):
+        label = text.get('label')
+        return label if label in ('phishing', 'legitimate') else 'unknown'
     t = (text or '').lower()
     if 'phishing' in t:
         return 'phishing'
@@ -12,13 +33,59 @@ def _label_from_text(text: str):
         return 'phishing'
     return 'unknown'
 
-def ensemble_predict(url: str) -> dict:
+def ensemble_predict(url: str, mode: str = None, low: float = None, high: float = None) -> dict:
     """Run both URL- and Website-based detectors and combine by majority.
-    Returns dict: {url, url_pred, site_pred, combined, confidence}
+    Returns dict: {url, url_pred, site_pred, combined, confidence, mode, stages}
+
+    In 'parallel' mode the detectors run concurrently and share one download
+    of the page (a FetchContext), so the site is fetched once per request.
+    'cascade' mode is cheaper: see _cascade(). stages lists the detector
+    stages that ran.
     """
-    url_pred_text = phishing_url_service.predict_phishing_url(url)
-    site_pred_text = phishing_website_service.predict_phishing_website(url)
+    mode = mode or DEFAULT_MODE
+    if mode not in ENSEMBLE_MODES:
+        raise ValueError(f'Unknown ensemble mode: {mode!r} (expected one of {ENSEMBLE_MODES})')
+    if mode == 'cascade':
+        return _cascade(url, CASCADE_LOW if low is None else low, CASCADE_HIGH if high is None else high)
+
+    context = phishing_website_service.fetch_context(url)
+    url_future = _POOL.submit(phishing_url_service.predict_phishing_url, url, context=context)
+    site_pred_text = phishing_website_service.predict_phishing_website(url, context=context)
+    url_pred_text = url_future.result()
+    return _combine(url, url_pred_text, site_pred_text, 'parallel', ['url', 'website'])
+
+
+def _cascade(url, low, high):
+    # stage 1: lexical URL features (no network); a model probability at or
+    # beyond a threshold decides the URL. The heuristic used without a model
+    # is not calibrated (its score is ~1 as soon as any rule fires), so its
+    # score never ends the cascade early
+    url_pred = phishing_url_service.predict_phishing_url(url, tier='lexical')
+    score = url_pred.get('score')
+    calibrated = score is not None and url_pred.get('model_version') is not None
+    if calibrated and (score >= high or score <= low):
+        phishing = score >= high
+        return {
+            'url': url,
+            'url_pred': url_pred,
+            'site_pred': None,
+            'combined': 'Phishing' if phishing else 'Legitimate',
+            # fraction of the stages that ran agreeing, as in _combine(); the
+            # model's probability is reported as cascade_score
+            'confidence': 1.0,
+            'mode': 'cascade',
+            'stages': ['url_lexical'],
+            'cascade_score': score,
+        }
+    # stage 2, uncertain band or no model score: fetch and classify the website
+    site_pred = phishing_website_service.predict_phishing_website(
+        url, context=phishing_website_service.fetch_context(url))
+    out = _combine(url, url_pred, site_pred, 'cascade', ['url_lexical', 'website'])
+    out['cascade_score'] = score
+    return out
+
 
+def _combine(url, url_pred_text, site_pred_text, mode, stages):
     lab1 = _label_from_text(url_pred_text)
     lab2 = _label_from_text(site_pred_text)
 
@@ -40,5 +107,7 @@ def ensemble_predict(url: str) -> dict:
         'url_pred': url_pred_text,
         'site_pred': site_pred_text,
         'combined': combined,
-        'confidence': confidence
+        'confidence': confidence,
+        'mode': mode,
+        'stages': stages,
     }
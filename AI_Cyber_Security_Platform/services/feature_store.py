@@ -0,0 +1,113 @@
+"""Local feature store for the phishing URL and website detectors.
+
+Maps (model, normalized URL, extractor version, tier) to a packed feature
+vector (float32 unless the caller asks for another dtype, which is recorded
+with the row) plus extraction timestamps, so repeated URLs skip extraction.
+
+Feature groups age differently:
+- lexical features depend only on the URL string and never expire
+- network features (WHOIS, response time, fetched page) are stale after
+  NETWORK_TTL_HOURS; callers re-run only the network part when stale
+"""
+import os
+import sqlite3
+import time
+from urllib.parse import urlparse, urlsplit
+
+import numpy as np
+
+BASE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DB_PATH = os.environ.get('FEATURE_STORE_DB') or os.path.join(BASE, 'feature_store.db')
+NETWORK_TTL_HOURS = float(os.environ.get('FEATURE_STORE_NETWORK_TTL_HOURS', 24))
+
+
+def _get_conn():
+    return sqlite3.connect(DB_PATH, timeout=5)
+
+
+def _init():
+    conn = _get_conn()
+    c = conn.cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS features
+                 (model TEXT,
+                  url TEXT,
+                  version TEXT,
+                  tier TEXT,
+                  vector BLOB,
+                  extracted_at REAL,
+                  network_at REAL,
+                  dtype TEXT,
+                  PRIMARY KEY (model, url, version, tier))''')
+    # tables created before the vector dtype was recorded hold float32 only
+    columns = [row[1] for row in c.execute('PRAGMA table_info(features)')]
+    if 'dtype' not in columns:
+        c.execute('ALTER TABLE features ADD COLUMN dtype TEXT')
+    conn.commit()
+    conn.close()
+
+_init()
+
+
+def normalize_url(url):
+    """Return the store key for a URL.
+
+    A scheme is prefixed the way the URL extractor does it, and the scheme and
+    host are lowercased. Both changes leave every extracted feature unchanged.
+    """
+    url = url or ''
+    if not urlparse(url.strip()).scheme:
+        url = 'http://' + url
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    head = parts.scheme + '://' + parts.netloc
+    if url[:len(head)].lower() == head.lower():
+        url = head.lower() + url[len(head):]
+    return url
+
+
+def lookup(model, url, version, tier=''):
+    """Return (vector, network_fresh) for a stored entry, or None.
+
+    vector has the dtype it was saved with. network_fresh is False when the
+    entry's network features are older than NETWORK_TTL_HOURS; entries
+    without network features are always fresh.
+    """
+    conn = _get_conn()
+    c = conn.cursor()
+    c.execute('SELECT vector, network_at, dtype FROM features WHERE model=? AND url=? AND version=? AND tier=?',
+              (model, normalize_url(url), str(version), tier))
+    row = c.fetchone()
+    conn.close()
+    if not row:
+        return None
+    vector = np.frombuffer(row[0], dtype=np.dtype(row[2] or 'float32'))
+    network_at = row[1]
+    fresh = network_at is None or (time.time() - network_at) < NETWORK_TTL_HOURS * 3600
+    return vector, fresh
+
+
+def save(model, url, version, vector, tier='', network_at=None, dtype='float32'):
+    """Store a feature vector, packed as dtype.
+
+    network_at is when its network features were fetched (None if it has
+    none; 0 marks them stale right away, e.g. after a probe timed out).
+    """
+    save_many(model, version, [(url, vector, network_at)], tier, dtype)
+
+
+def save_many(model, version, rows, tier='', dtype='float32'):
+    """Store many (url, vector, network_at) rows in one transaction."""
+    dtype = np.dtype(dtype)
+    now = time.time()
+    conn = _get_conn()
+    c = conn.cursor()
+    c.executemany('''INSERT OR REPLACE INTO features
+                     (model, url, version, tier, vector, extracted_at, network_at, dtype)
+                     VALUES (?,?,?,?,?,?,?,?)''',
+                  [(model, normalize_url(url), str(version), tier,
+                    np.asarray(vector, dtype=dtype).tobytes(), now, network_at, dtype.name)
+                   for url, vector, network_at in rows])
+    conn.commit()
+    conn.close()
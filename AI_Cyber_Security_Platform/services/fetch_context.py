@@ -0,0 +1,75 @@
+"""One page download shared by every detector handling a request.
+
+The ensemble runs the URL and website detectors side by side on the same
+URL. Both need the site: the URL detector for its response time, the website
+detector for the page itself (body, status and redirect history). A
+FetchContext downloads it once, on first demand, in a background thread:
+response_time() returns as soon as the headers are in, page() once the body
+is read, and every caller sees the same result or the same error.
+"""
+import threading
+
+
+class FetchContext:
+    """Request-scoped, lazily started download of one URL.
+
+    fetch(url, on_response) must return a page dict (see fetch_page in the
+    website extractor) and call on_response(response) when the headers
+    arrive; a page served without a live request (e.g. from the snapshot
+    store) supplies its time as page['elapsed'].
+    """
+
+    def __init__(self, url, fetch):
+        self.url = url
+        self._fetch = fetch
+        self._lock = threading.Lock()
+        self._started = False
+        self._headers = threading.Event()
+        self._done = threading.Event()
+        self._page = None
+        self._error = None
+        self._elapsed = None
+
+    def start(self):
+        """Begin the download (once); later calls do nothing."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._run, name='fetch-context', daemon=True).start()
+
+    def _run(self):
+        try:
+            self._page = self._fetch(self.url, self._on_response)
+            if self._elapsed is None:
+                self._elapsed = self._page.get('elapsed')
+        except Exception as e:
+            self._error = e
+        finally:
+            self._headers.set()
+            self._done.set()
+
+    def _on_response(self, response):
+        self._elapsed = response.elapsed.total_seconds()
+        self._headers.set()
+
+    def page(self, timeout=None):
+        """Return the page dict, raising the download's error if it failed."""
+        self.start()
+        if not self._done.wait(timeout):
+            raise TimeoutError(f'page download of {self.url} did not finish in {timeout}s')
+        if self._error is not None:
+            raise self._error
+        return self._page
+
+    def response_time(self, timeout=None):
+        """Seconds until the response headers arrived (None when unknown).
+
+        Raises the download's error when it failed before any response.
+        """
+        self.start()
+        if not self._headers.wait(timeout):
+            raise TimeoutError(f'no response from {self.url} in {timeout}s')
+        if self._elapsed is None and self._error is not None:
+            raise self._error
+        return self._elapsed
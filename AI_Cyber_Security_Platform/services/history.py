@@ -33,6 +33,16 @@ def save_prediction(service, input_text, result):
     conn.commit()
     conn.close()
 
+def save_predictions(rows):
+    """Insert many (service, input, result) rows in one transaction."""
+    now = datetime.utcnow().isoformat()
+    conn = _get_conn()
+    c = conn.cursor()
+    c.executemany('INSERT INTO predictions (service, input, result, created_at) VALUES (?,?,?,?)',
+                  [(service, input_text, result, now) for service, input_text, result in rows])
+    conn.commit()
+    conn.close()
+
 def get_stats():
     conn = _get_conn()
     c = conn.cursor()
@@ -0,0 +1,181 @@
+"""Hot-reloadable registry of the deployed model artifacts.
+
+Each service registers its model file here instead of keeping a module-level
+``joblib.load`` result. A new artifact is loaded in a background thread, must
+pass a warmup prediction, and only then replaces the active model in a single
+reference assignment, so in-flight requests finish on the model they started
+with. Reloads are triggered by the file watcher (start_watcher) or by an admin
+call (reload). The active version is the first 12 hex digits of the file's
+SHA-256, identical on every worker serving the same artifact.
+
+  MODEL_WATCH_INTERVAL   seconds between model file checks, 0 disables (default 30)
+"""
+import hashlib
+import os
+import threading
+import time
+
+import joblib
+
+from . import compiled_model
+
+WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 30))
+
+_registries = {}
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _file_version(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()[:12]
+
+
+class ModelRegistry:
+    """One model artifact: the active (model, version) pair and its reloads.
+
+    warmup(model) is called on every newly loaded model and must raise if the
+    model cannot serve predictions; on_swap() runs after each swap (e.g. to
+    drop cached verdicts of the previous model). With ``sample`` (a function
+    returning example inputs for a model) the model is replaced by its
+    compiled NumPy scorer when that reproduces it on the sample.
+    """
+
+    def __init__(self, name, path, warmup=None, on_swap=None, loader=joblib.load, sample=None):
+        self.name = name
+        self.path = path
+        self.warmup = warmup
+        self.on_swap = on_swap
+        self.loader = loader
+        self.sample = sample
+        self._active = (None, None)
+        self._signature = None
+        self._loaded_at = None
+        self._last_error = None
+        self._reloading = None
+        self._lock = threading.Lock()
+        _registries[name] = self
+
+    @property
+    def model(self):
+        return self._active[0]
+
+    @property
+    def version(self):
+        return self._active[1]
+
+    def active(self):
+        """Return (model, version) as one consistent pair."""
+        return self._active
+
+    def load(self):
+        """Load, warm up and activate the artifact now; return True on success.
+
+        On any failure the previously active model stays in place.
+        """
+        signature = _file_signature(self.path)
+        if signature is None:
+            self._signature = None
+            self._last_error = 'model file not found'
+            return False
+        try:
+            version = _file_version(self.path)
+            if version == self.version:
+                self._signature = signature
+                return True
+            model = self.loader(self.path)
+            if self.warmup is not None:
+                self.warmup(model)
+            sample = self.sample(model) if self.sample is not None else None
+            if sample is not None:
+                model = compiled_model.compile_model(model, sample)
+        except Exception as e:
+            # remember the failed file so the watcher does not retry it in a loop
+            self._signature = signature
+            self._last_error = f'{type(e).__name__}: {e}'
+            return False
+        self._active = (model, version)
+        self._signature = signature
+        self._loaded_at = time.time()
+        self._last_error = None
+        if self.on_swap is not None:
+            try:
+                self.on_swap()
+            except Exception:
+                pass
+        return True
+
+    def reload(self, wait=False):
+        """Load the artifact in a background thread (one at a time)."""
+        with self._lock:
+            thread = self._reloading
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(target=self.load, name=f'model-reload-{self.name}', daemon=True)
+                self._reloading = thread
+                thread.start()
+        if wait:
+            thread.join()
+        return thread
+
+    def changed(self):
+        """True when the model file differs from the last one loaded or tried."""
+        return _file_signature(self.path) != self._signature
+
+    def status(self):
+        return {
+            'name': self.name,
+            'path': self.path,
+            'version': self.version,
+            'loaded': self.model is not None,
+            'compiled': isinstance(self.model, compiled_model.CompiledModel),
+            'loaded_at': self._loaded_at,
+            'last_error': self._last_error,
+        }
+
+
+def get(name):
+    return _registries[name]
+
+
+def all_status():
+    return [r.status() for r in _registries.values()]
+
+
+def check_all():
+    """Start a background reload for every registry whose model file changed."""
+    for registry in list(_registries.values()):
+        if registry.changed():
+            registry.reload()
+
+
+def _watch(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            check_all()
+        except Exception:
+            pass
+
+
+def start_watcher(interval=None):
+    """Poll the model files every ``interval`` seconds in a daemon thread."""
+    global _watcher
+    interval = WATCH_INTERVAL if interval is None else interval
+    if interval <= 0:
+        return None
+    with _watcher_lock:
+        if _watcher is None or not _watcher.is_alive():
+            _watcher = threading.Thread(target=_watch, args=(interval,), name='model-watcher', daemon=True)
+            _watcher.start()
+    return _watcher
@@ -1,7 +1,12 @@
 import os
+import time
 import importlib.util
-import joblib
 import re
+import bisect
+import numpy as np
+from . import feature_store
+from .verdict_cache import VerdictCache, canonical_url
+from .model_registry import ModelRegistry
 try:
     # prefer package import if available
     from models.phishing_url.feature_extraction import *
@@ -9,8 +14,14 @@ try:
 except Exception:
     _feature_extractor_pkg = False
 
+try:
+    from models.phishing_url.feature_extraction import EXTRACTION_TIERS
+except Exception:
+    EXTRACTION_TIERS = ('lexical', 'standard', 'full')
+
 # This service expects:
 # - feature_extraction.py with a `main(url)` function that returns a list of features
+#   (preferably also `extract_vector(url, tier, out)` writing a float32 row)
 # - optional model at models/phishing_url/phishing_url_model.pkl
 
 BASE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -27,12 +38,53 @@ if not _feature_extractor_pkg and os.path.exists(FE_PATH):
     except Exception:
         _feature_extractor = None
 
-_model = None
-if os.path.exists(MODEL_PATH):
-    try:
-        _model = joblib.load(MODEL_PATH)
-    except Exception:
-        _model = None
+# recent verdicts, keyed on (canonical URL, tier)
+_verdicts = VerdictCache()
+
+
+def _n_features(model):
+    mod = _extractor_module()
+    return getattr(model, 'n_features_in_', None) or len(getattr(mod, 'VECTOR_ATTRIBUTES', ())) or 6
+
+
+def _warmup(model):
+    X = np.zeros((1, _n_features(model)), dtype=np.float32)
+    if hasattr(model, 'predict_proba'):
+        model.predict_proba(X)
+    else:
+        model.predict(X)
+
+
+def _sample(model):
+    # small counts and lengths like real URL vectors, plus an all-zero row
+    rng = np.random.RandomState(0)
+    X = rng.randint(0, 60, size=(64, _n_features(model))).astype(np.float32)
+    X[0] = 0
+    return X
+
+
+# cached verdicts belong to the model that produced them
+_registry = ModelRegistry('phishing_url', MODEL_PATH, warmup=_warmup, sample=_sample,
+                          on_swap=lambda: _verdicts.invalidate())
+
+
+def _cache_verdict(url: str, tier: str, out: dict):
+    # failed inferences are retried on the next request
+    if out.get('label') != 'error':
+        _verdicts.set((canonical_url(url), tier), out)
+
+
+def invalidate_verdicts(url: str = None) -> int:
+    """Drop cached verdicts (all of them, or every tier of one URL); return the count."""
+    if url is None:
+        return _verdicts.invalidate()
+    key = canonical_url(url)
+    return _verdicts.invalidate(lambda k: k[0] == key)
+
+
+def verdict_cache_stats() -> dict:
+    return _verdicts.stats()
+
 
 def _coerce_list_to_floats(lst):
     out = []
@@ -66,20 +118,27 @@ def _lightweight_extract(url: str):
     has_https = 1 if s.startswith('https') or s.startswith('https://') else 0
     return [length, dot_count, hyphen_count, has_at, int(has_ip), int(has_https)]
 
-def _call_extractor(url: str):
+def _call_with_tier(func, url: str, tier: str):
+    # only tier-aware extractors (main) are given a non-default tier
+    if tier == 'full':
+        return func(url)
+    return func(url, tier=tier)
+
+
+def _call_extractor(url: str, tier: str = 'full'):
     # try common function names in extractor modules
     # prefer package module
     if _feature_extractor_pkg:
         pkg = importlib.import_module('models.phishing_url.feature_extraction')
         for fname in ('main', 'extract_features', 'extract_features_from_url', 'extract'):
             if hasattr(pkg, fname):
-                return getattr(pkg, fname)(url)
+                return _call_with_tier(getattr(pkg, fname), url, tier)
     if not _feature_extractor:
         raise FileNotFoundError('Feature extractor not found')
     for fname in ('main', 'extract_features', 'extract_features_from_url', 'extract'):
         if hasattr(_feature_extractor, fname):
             func = getattr(_feature_extractor, fname)
-            return func(url)
+            return _call_with_tier(func, url, tier)
     # fallback: try functions that start with 'extract' or 'get'
     for name in dir(_feature_extractor):
         if name.lower().startswith('extract') or name.lower().startswith('get'):
@@ -92,115 +151,367 @@ def _call_extractor(url: str):
     raise AttributeError('No suitable extractor function found in feature_extraction.py')
 
 
-def _heuristic_score_url(url: str, features: list):
-    """Lightweight heuristic that returns (score, reasons).
+def _extractor_module():
+    if _feature_extractor_pkg:
+        return importlib.import_module('models.phishing_url.feature_extraction')
+    return _feature_extractor
 
-    Reasons is a list of short strings explaining which checks contributed.
-    """
-    s = str(url).strip().lower()
-    score = 0.0
-    weight = 0.0
-    reasons = []
 
-    def add(w, reason=None, v=1.0):
-        nonlocal score, weight
-        score += w * v
-        weight += w
-        if reason:
-            reasons.append(reason)
+_registry.load()
 
-    # IP address in URL
-    if re.search(r"\b\d{1,3}(?:\.\d{1,3}){3}\b", s):
-        add(3.0, 'IP address in host')
 
-    # @ symbol often used in phishing
-    if '@' in s:
-        add(2.5, "'@' symbol in URL")
+def _network_indexes(mod, tier: str):
+    # vector positions of the network features a tier actually probes
+    return [mod.VECTOR_ATTRIBUTES.index(name) for name in mod.TIER_NETWORK_FEATURES[tier]]
 
-    # double dots or many dots
-    if '..' in s or re.search(r"\.{3,}", s):
-        add(2.0, 'Consecutive dots found')
 
-    # long URL
-    if len(s) > 75:
-        add(1.5, 'Long URL')
+def _network_at(mod, tier: str, vector):
+    # when the vector's network features were fetched; a timed-out probe
+    # marks them stale right away
+    if tier == 'lexical':
+        return None
+    sentinel = mod.NETWORK_TIMEOUT_SENTINEL
+    timed_out = any(vector[i] == sentinel for i in _network_indexes(mod, tier))
+    return 0.0 if timed_out else time.time()
+
+
+def _save_features(mod, url: str, tier: str, vector):
+    """Store an extracted vector; a timed-out probe marks network features stale."""
+    _save_many_features(mod, tier, [(url, vector)])
+
 
-    # host analysis
-    host = s
+def _save_many_features(mod, tier: str, items):
+    # (url, vector) pairs, written in one transaction
     try:
-        host = re.sub(r'^https?://', '', host)
-        host = host.split('/')[0]
+        feature_store.save_many('phishing_url', mod.FEATURE_VERSION,
+                                [(url, vector, _network_at(mod, tier, vector)) for url, vector in items],
+                                tier=tier)
     except Exception:
         pass
+
+
+def _lookup_features(mod, url: str, tier: str):
+    # (vector, network_fresh) from the feature store, or None
+    if mod is None or not hasattr(mod, 'FEATURE_VERSION'):
+        return None
+    try:
+        return feature_store.lookup('phishing_url', url, mod.FEATURE_VERSION, tier)
+    except Exception:
+        return None
+
+
+def _with_network(mod, vector, network):
+    vector = vector.copy()
+    for name, value in network.items():
+        vector[mod.VECTOR_ATTRIBUTES.index(name)] = _coerce_list_to_floats([value])[0]
+    return vector
+
+
+def _stored_features(url: str, tier: str):
+    """Return the float32 vector from the feature store, or None.
+
+    Lexical columns never expire; when the network columns are stale only the
+    network probes are re-run and the entry is updated.
+    """
+    mod = _extractor_module()
+    hit = _lookup_features(mod, url, tier)
+    if hit is None:
+        return None
+    vector, fresh = hit
+    if fresh:
+        return vector
+    try:
+        network = mod.network_features(mod.start_url(url)['url'], probes=mod.tier_probes(tier))
+    except Exception:
+        return None
+    vector = _with_network(mod, vector, network)
+    _save_features(mod, url, tier, vector)
+    return vector
+
+
+def _stored_batch(mod, urls, tier: str):
+    """Feature store vectors for many URLs (None for misses).
+
+    The network columns of all stale entries are re-probed together, side by
+    side, and the refreshed entries are written in one transaction.
+    """
+    vectors = [None] * len(urls)
+    stale = []
+    for i, url in enumerate(urls):
+        hit = _lookup_features(mod, url, tier)
+        if hit is None:
+            continue
+        vectors[i] = hit[0]
+        if not hit[1]:
+            stale.append(i)
+    if not stale:
+        return vectors
+    try:
+        full_urls = [mod.start_url(urls[i])['url'] for i in stale]
+        if hasattr(mod, 'network_features_batch'):
+            networks = mod.network_features_batch(full_urls, mod.tier_probes(tier))
+        else:
+            networks = [mod.network_features(u, probes=mod.tier_probes(tier)) for u in full_urls]
+    except Exception:
+        for i in stale:
+            vectors[i] = None
+        return vectors
+    for i, network in zip(stale, networks):
+        vectors[i] = _with_network(mod, vectors[i], network)
+    _save_many_features(mod, tier, [(urls[i], vectors[i]) for i in stale])
+    return vectors
+
+
+def _extract_vector(url: str, tier: str, context=None):
+    """Extract straight into a float32 row with extract_vector(), or return None.
+
+    Returns None when the loaded extractor has no numeric API, so the caller
+    falls back to the list-based extractors. With a fetch context the
+    response-time probe reads the context's download instead of its own.
+    """
+    mod = _extractor_module()
+    if mod is None or not hasattr(mod, 'extract_vector'):
+        return None
+    overrides = None
+    if context is not None and hasattr(mod, 'shared_time_response'):
+        overrides = {'timeresponse_url': mod.shared_time_response(context.response_time, context.url)}
+    vector = mod.extract_vector(url, tier, out=np.empty(len(mod.VECTOR_ATTRIBUTES), dtype=np.float32),
+                                probe_overrides=overrides)
+    if hasattr(mod, 'FEATURE_VERSION'):
+        _save_features(mod, url, tier, vector)
+    return vector
+
+
+# Heuristic rules, compiled once. Weights, reasons and their order are those
+# of the original scorer; substring rules use C-level `in` checks and the only
+# regex (IP address) runs when the URL has enough dots and digits to hold one.
+_SUSPICIOUS_TOKENS = tuple((token, f"Suspicious token: {token}") for token in
+                           ('login', 'signin', 'verify', 'confirm', 'account', 'secure', 'bank', 'update'))
+_IP_RE = re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}\b")
+_DIGIT_DOT_RE = re.compile(r"\d\.\d")
+
+
+def _may_hold_ip(s: str) -> bool:
+    return s.count('.') >= 3 and _DIGIT_DOT_RE.search(s) is not None
+
+
+def _score_rules(s: str, ip: bool, features):
+    """Evaluate every rule on a stripped, lowercased URL; return (score, reasons)."""
+    weight = 0.0
+    reasons = []
+    if ip:
+        weight += 3.0
+        reasons.append('IP address in host')
+    if '@' in s:
+        weight += 2.5
+        reasons.append("'@' symbol in URL")
+    if '..' in s:
+        weight += 2.0
+        reasons.append('Consecutive dots found')
+    if len(s) > 75:
+        weight += 1.5
+        reasons.append('Long URL')
+
+    # host: strip an http(s) scheme, cut at the first '/'
+    if s.startswith('http://'):
+        host = s[7:]
+    elif s.startswith('https://'):
+        host = s[8:]
+    else:
+        host = s
+    host = host.split('/', 1)[0]
     dots = host.count('.')
     if dots >= 4:
-        add(1.5, 'Many subdomains')
+        weight += 1.5
+        reasons.append('Many subdomains')
     elif dots >= 2:
-        add(0.5, f'{dots} dots in host')
+        weight += 0.5
+        reasons.append(f'{dots} dots in host')
 
-    # suspicious tokens
-    for token in ('login', 'signin', 'verify', 'confirm', 'account', 'secure', 'bank', 'update'):
+    for token, reason in _SUSPICIOUS_TOKENS:
         if token in s:
-            add(1.0, f"Suspicious token: {token}")
+            weight += 1.0
+            reasons.append(reason)
 
-    # hyphens
     hyph = host.count('-')
     if hyph >= 3:
-        add(1.0, 'Many hyphens in host')
+        weight += 1.0
+        reasons.append('Many hyphens in host')
     elif hyph > 0:
-        add(0.2, f'{hyph} hyphens')
+        weight += 0.2
+        reasons.append(f'{hyph} hyphens')
 
     # feature-derived heuristics (if features provided)
     try:
-        if features and len(features) > 0:
-            flen = float(features[0])
-            if flen > 100:
-                add(0.8, 'Very long URL (from features)')
+        if features and len(features) > 0 and float(features[0]) > 100:
+            weight += 0.8
+            reasons.append('Very long URL (from features)')
     except Exception:
         pass
 
     if weight <= 0:
         return 0.0, []
-    val = score / (weight + 1e-9)
+    # every rule contributes its full weight, so the score sum equals the weight sum
+    val = weight / (weight + 1e-9)
     val = max(0.0, min(1.0, val))
     return val, reasons
 
 
-def predict_phishing_url(url: str) -> dict:
-    """Return a structured dict: {label, score, features}
-    - label: 'phishing'|'legitimate'|'unknown'
-    - score: probability-like float 0..1 when available
-    - features: numeric feature list
+def _heuristic_score_url(url: str, features: list):
+    """Lightweight heuristic that returns (score, reasons).
+
+    Reasons is a list of short strings explaining which checks contributed.
     """
-    try:
-        feats = _call_extractor(url)
-    except FileNotFoundError:
-        feats = _lightweight_extract(url)
-    except Exception:
-        feats = _lightweight_extract(url)
+    s = str(url).strip().lower()
+    ip = _may_hold_ip(s) and _IP_RE.search(s) is not None
+    return _score_rules(s, ip, features)
+
+
+def heuristic_score(url: str, features=None):
+    """(score, reasons) of the rule-based scorer, without any model or network."""
+    return _heuristic_score_url(url, features)
+
+
+def _heuristic_score_urls(urls, features=None):
+    """Batch variant of _heuristic_score_url: one (score, reasons) per URL.
 
-    numeric = _coerce_list_to_floats(feats)
-    out = {'label': 'unknown', 'score': None, 'features': numeric}
-    if _model:
+    The IP rule runs as one regex scan over all candidate URLs joined by
+    newlines (a word boundary, like the end of a string).
+    """
+    texts = [str(u).strip().lower() for u in urls]
+    if features is None:
+        features = [None] * len(texts)
+    candidates = [i for i, s in enumerate(texts) if _may_hold_ip(s)]
+    has_ip = [False] * len(texts)
+    if candidates:
+        starts = []
+        pos = 0
+        for i in candidates:
+            starts.append(pos)
+            pos += len(texts[i]) + 1
+        joined = '\n'.join(texts[i] for i in candidates)
+        for m in _IP_RE.finditer(joined):
+            has_ip[candidates[bisect.bisect_right(starts, m.start()) - 1]] = True
+    return [_score_rules(s, ip, f) for s, ip, f in zip(texts, has_ip, features)]
+
+
+def _url_vector(url: str, tier: str, context=None):
+    """Return the float32 feature vector for one URL.
+
+    Repeated URLs are served from the local feature store; otherwise the
+    extractor writes a float32 row, falling back to the lightweight features.
+    """
+    vector = _stored_features(url, tier)
+    if vector is None:
+        try:
+            vector = _extract_vector(url, tier, context)
+            if vector is None:
+                vector = np.asarray(_coerce_list_to_floats(_call_extractor(url, tier)), dtype=np.float32)
+        except FileNotFoundError:
+            vector = np.asarray(_coerce_list_to_floats(_lightweight_extract(url)), dtype=np.float32)
+        except Exception:
+            vector = np.asarray(_coerce_list_to_floats(_lightweight_extract(url)), dtype=np.float32)
+    return vector
+
+
+def _batch_vectors(urls, tier: str):
+    """Return one float32 vector per URL, extracting store misses in one batch."""
+    mod = _extractor_module()
+    vectors = _stored_batch(mod, urls, tier)
+    missing = [i for i, v in enumerate(vectors) if v is None]
+    if missing and mod is not None and hasattr(mod, 'extract_batch'):
+        try:
+            X = mod.extract_batch([urls[i] for i in missing], tier)
+        except Exception:
+            X = None
+        if X is not None:
+            for row, i in enumerate(missing):
+                vectors[i] = X[row]
+            if hasattr(mod, 'FEATURE_VERSION'):
+                _save_many_features(mod, tier, [(urls[i], X[row]) for row, i in enumerate(missing)])
+    # anything left (no batch API, or it failed) goes through the single-URL path
+    return [v if v is not None else _url_vector(urls[i], tier) for i, v in enumerate(vectors)]
+
+
+def _predict_vectors(urls, vectors, tier: str):
+    """Score feature vectors with one model call per vector length.
+
+    Vectors normally share one length; lightweight fallbacks are shorter and
+    are scored as their own group.
+    """
+    # one (model, version) pair for the whole batch, even if a reload swaps it meanwhile
+    model, version = _registry.active()
+    outs = [{'label': 'unknown', 'score': None, 'features': v.tolist(), 'tier': tier,
+             'model_version': version} for v in vectors]
+    if not model:
+        # No trained model available — use a heuristic scorer to derive label, score, and reasons
+        scored = _heuristic_score_urls(urls, [out['features'] for out in outs])
+        for out, (score, reasons) in zip(outs, scored):
+            out['score'] = score
+            out['label'] = 'phishing' if score >= 0.5 else 'legitimate'
+            out['reasons'] = reasons
+        return outs
+    groups = {}
+    for i, v in enumerate(vectors):
+        groups.setdefault(len(v), []).append(i)
+    for indexes in groups.values():
+        X = np.vstack([vectors[i] for i in indexes])
         try:
             # prefer probability if available
-            if hasattr(_model, 'predict_proba'):
-                prob = _model.predict_proba([numeric])
-                # assume binary: class 1 -> phishing
-                score = float(prob[0][1])
-                pred = 1 if score >= 0.5 else 0
-                out['score'] = score
-                out['label'] = 'phishing' if pred == 1 else 'legitimate'
+            if hasattr(model, 'predict_proba'):
+                prob = model.predict_proba(X)
+                for row, i in enumerate(indexes):
+                    # assume binary: class 1 -> phishing
+                    score = float(prob[row][1])
+                    outs[i]['score'] = score
+                    outs[i]['label'] = 'phishing' if score >= 0.5 else 'legitimate'
             else:
-                pred = _model.predict([numeric])
-                out['label'] = 'phishing' if int(pred[0]) == 1 else 'legitimate'
+                pred = model.predict(X)
+                for row, i in enumerate(indexes):
+                    outs[i]['label'] = 'phishing' if int(pred[row]) == 1 else 'legitimate'
         except Exception:
-            out['label'] = 'error'
-            out['score'] = None
-    else:
-        # No trained model available — use a heuristic scorer to derive label, score, and reasons
-        score, reasons = _heuristic_score_url(url, numeric)
-        out['score'] = score
-        out['label'] = 'phishing' if score >= 0.5 else 'legitimate'
-        out['reasons'] = reasons
+            for i in indexes:
+                outs[i]['label'] = 'error'
+                outs[i]['score'] = None
+    return outs
+
+
+def predict_phishing_url(url: str, tier: str = 'full', context=None) -> dict:
+    """Return a structured dict: {label, score, features, tier}
+    - label: 'phishing'|'legitimate'|'unknown'
+    - score: probability-like float 0..1 when available
+    - features: numeric feature list
+    - tier: extraction tier used ('lexical' skips all network probes,
+      'standard' adds WHOIS, 'full' also measures the site's response time)
+    - model_version: version of the model that scored it (None for the heuristic)
+
+    context is an optional FetchContext (services/fetch_context.py) whose page
+    download is reused instead of probing the site again.
+    """
+    if tier not in EXTRACTION_TIERS:
+        raise ValueError(f'Unknown extraction tier: {tier!r}')
+    cached = _verdicts.get((canonical_url(url), tier))
+    if cached is not None:
+        return cached
+    out = _predict_vectors([url], [_url_vector(url, tier, context)], tier)[0]
+    _cache_verdict(url, tier, out)
     return out
+
+
+def predict_phishing_url_batch(urls, tier: str = 'full') -> list:
+    """Return predict_phishing_url() results for many URLs, in input order.
+
+    Features for the whole batch are extracted together and the model is
+    called once on the stacked matrix.
+    """
+    if tier not in EXTRACTION_TIERS:
+        raise ValueError(f'Unknown extraction tier: {tier!r}')
+    urls = [str(u) for u in urls]
+    results = [_verdicts.get((canonical_url(u), tier)) for u in urls]
+    missing = [i for i, r in enumerate(results) if r is None]
+    if missing:
+        todo = [urls[i] for i in missing]
+        for i, out in zip(missing, _predict_vectors(todo, _batch_vectors(todo, tier), tier)):
+            results[i] = out
+            _cache_verdict(urls[i], tier, out)
+    return results
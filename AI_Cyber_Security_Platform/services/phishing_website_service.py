@@ -1,18 +1,19 @@
 import os
-import joblib
+import time
 import importlib.util
+import numpy as np
+from . import crawler
+from .fetch_context import FetchContext
+from . import feature_store
+from . import snapshot_store
+from .model_registry import ModelRegistry
 
 BASE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 MODEL_PATH = os.path.join(BASE, 'models', 'phishing_website', 'phishing_model.pkl')
+# the feature schema the model was trained with (FeatureSchema.save)
+SCHEMA_PATH = os.path.join(BASE, 'models', 'phishing_website', 'phishing_model.schema.json')
 FE_PATH = os.path.join(BASE, 'models', 'phishing_website', 'feature_extraction.py')
 
-_model = None
-if os.path.exists(MODEL_PATH):
-    try:
-        _model = joblib.load(MODEL_PATH)
-    except Exception:
-        _model = None
-
 # load URLFeatureExtractor class from feature_extraction.py if available
 _extractor_module = None
 if os.path.exists(FE_PATH):
@@ -24,20 +25,69 @@ if os.path.exists(FE_PATH):
     except Exception:
         _extractor_module = None
 
-def _dict_to_ordered_list(d):
-    # deterministic ordering: sort keys
-    keys = sorted(d.keys())
-    vals = [d[k] for k in keys]
-    # coerce to floats where possible
-    out = []
-    for v in vals:
-        try:
-            out.append(float(v))
-        except Exception:
-            out.append(0.0)
-    return out
+# column layout the extractor writes (None without the extractor)
+_schema = getattr(_extractor_module, 'WEBSITE_SCHEMA', None)
+
+
+def _check_schema(model):
+    # refuse a model whose inputs are not the extractor's columns
+    if _schema is None:
+        return
+    if os.path.exists(SCHEMA_PATH):
+        model_schema = _extractor_module.FeatureSchema.load(SCHEMA_PATH)
+        if model_schema.version != _schema.version:
+            raise ValueError(f'model schema {model_schema.version} does not match extractor '
+                             f'schema {_schema.version}: {_schema.diff(model_schema)}')
+    n = getattr(model, 'n_features_in_', None)
+    if n is not None and n != len(_schema):
+        raise ValueError(f'model expects {n} features, extractor schema has {len(_schema)}')
+    names = getattr(model, 'feature_names_in_', None)
+    if names is not None and tuple(names) != _schema.names:
+        raise ValueError('model feature names do not match the extractor schema')
+
+
+def _warmup(model):
+    _check_schema(model)
+    # the website feature count is only known when the model records it
+    n = len(_schema) if _schema is not None else getattr(model, 'n_features_in_', None)
+    if n:
+        model.predict(np.zeros((1, n)))
+
+
+def _sample(model):
+    n = len(_schema) if _schema is not None else getattr(model, 'n_features_in_', None)
+    if not n:
+        return None
+    rng = np.random.RandomState(0)
+    return rng.rand(64, n) * rng.choice([1, 10, 100], size=(64, n))
+
+
+_registry = ModelRegistry('phishing_website', MODEL_PATH, warmup=_warmup, sample=_sample)
+_registry.load()
+
+
+def model_version():
+    """Version of the active website model (None when no model is loaded)."""
+    return _registry.version
+
+
+def save_schema(path=SCHEMA_PATH):
+    """Write the extractor's feature schema next to the model (run after training)."""
+    _schema.save(path)
+
+def predict_phishing_website(features, context=None) -> str:
+    # context is an optional FetchContext for the URL: its page is used
+    # instead of fetching one
+    return predict_phishing_website_with_version(features, context)[0]
+
+
+def predict_phishing_website_with_version(features, context=None):
+    """Return (result, model_version) for predict_phishing_website().
+
+    model_version is the version of the model that produced the result (None
+    when no model was used), read together with that model.
+    """
 
-def predict_phishing_website(features) -> str:
     # If features provided directly (list), use them
     vec = None
     if isinstance(features, (list, tuple)):
@@ -47,35 +97,150 @@ def predict_phishing_website(features) -> str:
             vec = None
 
     # If a string is provided, treat it as a URL to extract features
-    if isinstance(features, str) and _extractor_module and hasattr(_extractor_module, 'URLFeatureExtractor'):
+    if isinstance(features, str) and _extractor_module:
+        vec = _stored_features(features)
+
+    if vec is None and isinstance(features, str) and _extractor_module and hasattr(_extractor_module, 'URLFeatureExtractor'):
+        if context is not None:
+            vec = _extract_vector(features, fetch=lambda url, timeout=None: context.page())
+        elif hasattr(_extractor_module, 'fetch_page'):
+            # pages come from (and go to) the snapshot store
+            vec = _extract_vector(features, fetch=_fetch_snapshot)
+        else:
+            vec = _extract_vector(features)
+        if isinstance(vec, str):
+            return vec, None
+
+    return _classify(vec)
+
+
+def predict_phishing_websites(urls, **crawl_options):
+    """Classify many websites, downloading their pages concurrently.
+
+    Yields (url, result) in completion order, result being what
+    predict_phishing_website(url) returns. Pages are fetched by the crawler
+    (through the snapshot store) and each one is extracted as soon as it
+    arrives; URLs with fresh stored features are answered without a fetch.
+    crawl_options override the crawler limits (concurrency, per_host,
+    retries, deadline, backoff).
+    """
+    urls = list(urls)
+    if not (_extractor_module and hasattr(_extractor_module, 'fetch_page')):
+        for url in urls:
+            yield url, predict_phishing_website(url)
+        return
+
+    to_fetch = []
+    for url in urls:
+        vec = _stored_features(url) if isinstance(url, str) else None
+        if vec is not None:
+            yield url, _classify(vec)[0]
+        else:
+            to_fetch.append(url)
+
+    crawl_options.setdefault('refetch', _refetch_snapshot)
+    for url, page, error in crawler.crawl(to_fetch, _fetch_snapshot, **crawl_options):
+        if error is not None:
+            vec = _extract_vector(url, fetch=_raise(error))
+        else:
+            vec = _extract_vector(url, page=page)
+        yield url, vec if isinstance(vec, str) else _classify(vec)[0]
+
+
+def _raise(error):
+    def fetch(url, timeout=None):
+        raise error
+    return fetch
+
+
+def _extract_vector(url, **extractor_args):
+    # feature row of url, or an error message
+    try:
+        extractor_class = getattr(_extractor_module, 'URLFeatureExtractor')
+        extractor = extractor_class(url, **extractor_args)
+        if extractor.error:
+            return f'Feature extraction error: {extractor.error}'
+        row = extractor.write_row(_schema.new_row(), _schema)
+        # features of a rate-limit or server error page are not the site's
+        if not snapshot_store.is_transient(extractor.page):
+            _save_features(url, row)
+        return row
+    except Exception as e:
+        # fallback: simple lexical features similar to URL service
         try:
-            extractor_class = getattr(_extractor_module, 'URLFeatureExtractor')
-            extractor = extractor_class(features)
-            model_feats = extractor.extract_model_features()
-            if isinstance(model_feats, dict):
-                vec = _dict_to_ordered_list(model_feats)
-            elif isinstance(model_feats, list):
-                vec = [float(x) for x in model_feats]
-            else:
-                return f'Extractor returned unsupported type: {type(model_feats)}'
-        except Exception as e:
-            # fallback: simple lexical features similar to URL service
-            try:
-                vec = [float(x) for x in _lightweight_from_string(features)]
-            except Exception:
-                return f'Feature extraction error: {e}'
+            return [float(x) for x in _lightweight_from_string(url)]
+        except Exception:
+            return f'Feature extraction error: {e}'
+
 
-    if _model and vec is not None:
+def _classify(vec):
+    # (result text, version of the model used); model and version come from
+    # one active() call so a concurrent reload cannot mix them up
+    model, version = _registry.active()
+    if model and vec is not None:
         try:
-            pred = _model.predict([vec])
-            return 'Phishing Website' if int(pred[0]) == 1 else 'Legitimate Website'
+            pred = model.predict(np.asarray(vec, dtype=np.float64).reshape(1, -1))
+            return ('Phishing Website' if int(pred[0]) == 1 else 'Legitimate Website'), version
         except Exception as e:
-            return f'Model prediction error: {e}'
+            return f'Model prediction error: {e}', version
 
     # If model missing, show extracted features if available
     if vec is not None:
-        return 'Features extracted: ' + str(vec)
-    return 'Model not found. Place phishing_model.pkl in models/phishing_website/ or provide features.'
+        return 'Features extracted: ' + str([float(x) for x in vec]), None
+    return 'Model not found. Place phishing_model.pkl in models/phishing_website/ or provide features.', None
+
+
+def _fetch_snapshot(url: str, timeout=10, on_response=None, max_age_hours=snapshot_store.MAX_AGE_HOURS):
+    return snapshot_store.get_page(
+        url, lambda u: _extractor_module.fetch_page(u, timeout, on_response=on_response),
+        max_age_hours=max_age_hours)
+
+
+def _refetch_snapshot(url: str):
+    # crawler retries always download again
+    return _fetch_snapshot(url, max_age_hours=0)
+
+
+def fetch_context(url: str):
+    """A FetchContext downloading url through the snapshot store."""
+    return FetchContext(url, lambda u, on_response: _fetch_snapshot(u, on_response=on_response))
+
+
+def _feature_version():
+    # stored rows are only reused with the same extractor and column layout
+    version = getattr(_extractor_module, 'FEATURE_VERSION', None)
+    if version is None or _schema is None:
+        return None
+    return f'{version}-{_schema.version}'
+
+
+def _stored_features(url: str):
+    # every website feature comes from the fetched page, so the whole vector
+    # is treated as network features and re-extracted once stale
+    version = _feature_version()
+    if version is None:
+        return None
+    try:
+        hit = feature_store.lookup('phishing_website', url, version)
+    except Exception:
+        return None
+    # rows from before the dtype was recorded were rounded to float32
+    if hit is None or not hit[1] or hit[0].dtype != np.float64:
+        return None
+    return hit[0]
+
+
+def _save_features(url: str, vec):
+    version = _feature_version()
+    if version is None:
+        return
+    try:
+        # schema rows are float64; stored as such so cached and fresh
+        # predictions see the same values
+        feature_store.save('phishing_website', url, version, vec, network_at=time.time(),
+                           dtype=np.float64)
+    except Exception:
+        pass
 
 
 def _lightweight_from_string(s: str):
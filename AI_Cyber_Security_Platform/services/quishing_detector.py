@@ -32,6 +32,18 @@ except Exception:
 
 import requests
 
+# Pooled HTTP client shared with the feature extractors (optional)
+try:
+    from models import http_client
+except Exception:
+    http_client = requests
+
+# Shortener registry shared with the URL feature extractor (optional dependency)
+try:
+    from models.phishing_url.feature_extraction import is_shortener_host
+except Exception:
+    is_shortener_host = None
+
 
 def _safe_decode_qr(image_path: str) -> str:
     """Attempt to decode a QR code using OpenCV QRCodeDetector.
@@ -125,22 +137,29 @@ def _follow_redirects(url: str, timeout: int = 10, max_redirects: int = 20) -> D
     Uses `requests` with `allow_redirects=True` and captures `response.history`.
     Returns dict with keys: redirect_chain (list of URLs), redirect_count (int), final_url (str)
     """
-    session = requests.Session()
-    session.max_redirects = max_redirects
     headers = {
         'User-Agent': 'PhishGuard-Quishing-Detector/1.0 (+https://example.local)'
     }
     try:
         # Use GET with stream to avoid downloading large bodies unnecessarily
-        resp = session.get(url, headers=headers, timeout=timeout, allow_redirects=True, stream=True)
+        if http_client is requests:
+            session = requests.Session()
+            session.max_redirects = max_redirects
+            resp = session.get(url, headers=headers, timeout=timeout, allow_redirects=True, stream=True)
+        else:
+            resp = http_client.get(url, headers=headers, timeout=timeout, allow_redirects=True,
+                                   stream=True, max_redirects=max_redirects)
         chain = [r.url for r in resp.history] if resp.history else []
         final = resp.url
         # include final in chain return (but keep history separate for count)
         redirect_count = len(chain)
         full_chain = chain + [final]
-        # close streamed response
+        # release streamed response without reading the body
         try:
-            resp.close()
+            if hasattr(http_client, 'discard'):
+                http_client.discard(resp)
+            else:
+                resp.close()
         except Exception:
             pass
         return {
@@ -206,9 +225,32 @@ def _final_domain(url: str) -> str:
         return ''
 
 
-def analyze_qr_risk(scanned_url: str) -> Dict[str, Any]:
+def is_shortened_url(url: str) -> bool:
+    """Return True if the URL's host is a known URL shortener.
+
+    Uses the host-indexed registry from the phishing URL extractor; returns
+    False when that module is unavailable.
+    """
+    if is_shortener_host is None:
+        return False
+    return is_shortener_host(_final_domain(url))
+
+
+def needs_redirect_resolution(url: str, mode: str = 'always') -> bool:
+    """Decide before any network call whether a QR payload should be resolved.
+
+    - 'always': resolve every payload (default)
+    - 'shorteners': resolve only payloads hosted on a known URL shortener
+    """
+    if mode == 'shorteners':
+        return is_shortened_url(url)
+    return True
+
+
+def analyze_qr_risk(scanned_url: str, unshorten: bool = True) -> Dict[str, Any]:
     """Unshorten and analyze the final URL for suspicious patterns.
 
+    Set unshorten=False to skip the HEAD request and analyze scanned_url as-is.
     Returns a dict with keys: final_url, risk_level, warnings
     """
     results = {
@@ -218,13 +260,14 @@ def analyze_qr_risk(scanned_url: str) -> Dict[str, Any]:
     }
 
     # STEP 1: Unshorten (follow redirects) using HEAD
-    try:
-        response = requests.head(scanned_url, allow_redirects=True, timeout=5)
-        results['final_url'] = response.url
-        if response.history:
-            results['warnings'].append(f"Redirected {len(response.history)} times")
-    except Exception:
-        results['warnings'].append('URL is unreachable (Potential Block)')
+    if unshorten:
+        try:
+            response = http_client.head(scanned_url, allow_redirects=True, timeout=5)
+            results['final_url'] = response.url
+            if response.history:
+                results['warnings'].append(f"Redirected {len(response.history)} times")
+        except Exception:
+            results['warnings'].append('URL is unreachable (Potential Block)')
 
     # STEP 2: Analyze destination
     final_url_lower = results['final_url'].lower()
@@ -250,11 +293,12 @@ def analyze_qr_risk(scanned_url: str) -> Dict[str, Any]:
     return results
 
 
-def analyze_qr_quishing(image_path: str) -> Dict[str, Any]:
+def analyze_qr_quishing(image_path: str, resolve_redirects: str = 'always') -> Dict[str, Any]:
     """Main public function.
 
     Parameters
     - image_path: path to an image file containing a QR code
+    - resolve_redirects: 'always' or 'shorteners' (see needs_redirect_resolution)
 
     Returns a dict with the structure:
     {
@@ -287,7 +331,12 @@ def analyze_qr_quishing(image_path: str) -> Dict[str, Any]:
         decoded = 'http://' + decoded
 
     # Follow redirects (quick analysis) then perform deeper URL risk analysis
-    follow = _follow_redirects(decoded)
+    shortened = is_shortened_url(decoded)
+    resolve = needs_redirect_resolution(decoded, resolve_redirects)
+    if resolve:
+        follow = _follow_redirects(decoded)
+    else:
+        follow = {'redirect_chain': [decoded], 'redirect_count': 0, 'final_url': decoded}
     redirect_chain = follow.get('redirect_chain', [])
     redirect_count = follow.get('redirect_count', 0)
     final_url = follow.get('final_url', decoded)
@@ -297,7 +346,7 @@ def analyze_qr_quishing(image_path: str) -> Dict[str, Any]:
 
     # URL risk analysis (unshorten + heuristics)
     try:
-        url_analysis = analyze_qr_risk(decoded)
+        url_analysis = analyze_qr_risk(decoded, unshorten=resolve)
     except Exception:
         url_analysis = None
 
@@ -307,6 +356,8 @@ def analyze_qr_quishing(image_path: str) -> Dict[str, Any]:
         redirect_count = url_analysis.get('redirect_count', redirect_count)
         risk_level = url_analysis.get('risk_level', 'LOW')
         warnings = url_analysis.get('warnings', [])
+        if shortened:
+            warnings.append(f"Payload uses a URL shortener ({_final_domain(decoded)})")
     else:
         # Fallback to simple classifier
         risk_level = _classify_risk(redirect_count)
@@ -333,6 +384,8 @@ def analyze_qr_quishing(image_path: str) -> Dict[str, Any]:
         'redirect_count': redirect_count,
         'final_url': final_url,
         'final_domain': final_domain,
+        'is_shortener': shortened,
+        'redirect_resolved': resolve,
         'risk_level': risk_level,
         'warnings': warnings,
         'user_warning': user_warning,
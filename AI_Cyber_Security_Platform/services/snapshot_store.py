@@ -0,0 +1,246 @@
+"""Content-addressed store of downloaded pages for the website detector.
+
+Bodies are stored once per SHA-256 of their bytes, zlib-compressed, under
+SNAPSHOT_DIR/<hash[:2]>/<hash>.z; an SQLite table records every fetch (URL,
+final URL, status, redirect history, response time, encoding, truncation,
+body hash, time). Extraction reads pages from here, so features can be
+recomputed after a model or extractor change without crawling again
+(get_page(..., max_age_hours=None) returns the latest snapshot of any age),
+and concurrent requests for the same URL share one download.
+
+Snapshots older than SNAPSHOT_RETENTION_DAYS are deleted by prune(), which
+save() runs at most once per SNAPSHOT_PRUNE_INTERVAL seconds; body files no
+longer referenced by any snapshot are removed with them.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from .feature_store import normalize_url
+
+BASE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DB_PATH = os.environ.get('SNAPSHOT_DB') or os.path.join(BASE, 'snapshots.db')
+SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR') or os.path.join(BASE, 'snapshots')
+# snapshots younger than this are served instead of downloading again
+MAX_AGE_HOURS = float(os.environ.get('SNAPSHOT_MAX_AGE_HOURS', 1))
+# snapshots are kept this long (0 keeps them forever)
+RETENTION_DAYS = float(os.environ.get('SNAPSHOT_RETENTION_DAYS', 7))
+PRUNE_INTERVAL = float(os.environ.get('SNAPSHOT_PRUNE_INTERVAL', 3600))
+# rate limiting and server errors say nothing about the page; such responses
+# are returned by get_page() but never stored
+TRANSIENT_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def _get_conn():
+    return sqlite3.connect(DB_PATH, timeout=5)
+
+
+def _init():
+    conn = _get_conn()
+    c = conn.cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS snapshots
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  url TEXT,
+                  final_url TEXT,
+                  status INTEGER,
+                  history TEXT,
+                  encoding TEXT,
+                  body_hash TEXT,
+                  fetched_at REAL,
+                  elapsed REAL,
+                  truncated INTEGER)''')
+    c.execute('CREATE INDEX IF NOT EXISTS snapshots_url ON snapshots (url, fetched_at)')
+    # tables created before response times and truncation were recorded
+    columns = [row[1] for row in c.execute('PRAGMA table_info(snapshots)')]
+    if 'elapsed' not in columns:
+        c.execute('ALTER TABLE snapshots ADD COLUMN elapsed REAL')
+    if 'truncated' not in columns:
+        c.execute('ALTER TABLE snapshots ADD COLUMN truncated INTEGER')
+    c.execute('CREATE INDEX IF NOT EXISTS snapshots_time ON snapshots (fetched_at)')
+    c.execute('CREATE INDEX IF NOT EXISTS snapshots_body ON snapshots (body_hash)')
+    conn.commit()
+    conn.close()
+
+_init()
+
+
+# held while a body file is written and its row inserted, and while prune()
+# looks for unreferenced bodies and removes them, so a body shared with a
+# snapshot being saved is never deleted under it
+_write_lock = threading.Lock()
+
+
+def _body_path(body_hash):
+    return os.path.join(SNAPSHOT_DIR, body_hash[:2], body_hash + '.z')
+
+
+def save_body(body):
+    """Store body bytes (once per content) and return their hash."""
+    body_hash = hashlib.sha256(body).hexdigest()
+    path = _body_path(body_hash)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(zlib.compress(body, 6))
+        os.replace(tmp, path)
+    return body_hash
+
+
+def load_body(body_hash):
+    with open(_body_path(body_hash), 'rb') as f:
+        return zlib.decompress(f.read())
+
+
+def save(page):
+    """Record a fetched page dict (see fetch_page in the website extractor)."""
+    with _write_lock:
+        body_hash = save_body(page['body'])
+        conn = _get_conn()
+        c = conn.cursor()
+        c.execute('''INSERT INTO snapshots (url, final_url, status, history, encoding, body_hash, fetched_at,
+                                            elapsed, truncated)
+                     VALUES (?,?,?,?,?,?,?,?,?)''',
+                  (normalize_url(page['url']), page.get('final_url'), page.get('status'),
+                   json.dumps(page.get('history') or []), page.get('encoding'), body_hash, time.time(),
+                   page.get('elapsed'), int(bool(page.get('truncated')))))
+        conn.commit()
+        conn.close()
+    _maybe_prune()
+    return body_hash
+
+
+_last_prune = 0.0
+_prune_lock = threading.Lock()
+
+
+def _maybe_prune():
+    global _last_prune
+    if RETENTION_DAYS <= 0:
+        return
+    with _prune_lock:
+        if time.time() - _last_prune < PRUNE_INTERVAL:
+            return
+        _last_prune = time.time()
+    try:
+        prune()
+    except Exception:
+        pass
+
+
+def prune(max_age_days=None):
+    """Delete snapshots older than max_age_days (RETENTION_DAYS by default).
+
+    Body files no longer referenced by a remaining snapshot are removed.
+    Returns the number of snapshots deleted. Another process saving the same
+    body meanwhile can still lose its file; latest() then reports a miss and
+    get_page() downloads (and stores) the page again.
+    """
+    max_age_days = RETENTION_DAYS if max_age_days is None else max_age_days
+    cutoff = time.time() - max_age_days * 86400
+    conn = _get_conn()
+    c = conn.cursor()
+    hashes = [row[0] for row in c.execute('SELECT DISTINCT body_hash FROM snapshots WHERE fetched_at < ?',
+                                          (cutoff,))]
+    deleted = c.execute('DELETE FROM snapshots WHERE fetched_at < ?', (cutoff,)).rowcount
+    conn.commit()
+    with _write_lock:
+        for body_hash in hashes:
+            if c.execute('SELECT 1 FROM snapshots WHERE body_hash=? LIMIT 1', (body_hash,)).fetchone():
+                continue
+            try:
+                os.remove(_body_path(body_hash))
+            except OSError:
+                pass
+    conn.close()
+    return deleted
+
+
+def latest(url, max_age_hours=None):
+    """Return the newest snapshot of url as a page dict, or None.
+
+    With max_age_hours, older snapshots are ignored; a snapshot whose body
+    file is missing or unreadable counts as absent. The dict also carries
+    body_hash and fetched_at; elapsed is None for snapshots recorded without
+    a response time.
+    """
+    conn = _get_conn()
+    c = conn.cursor()
+    c.execute('''SELECT final_url, status, history, encoding, body_hash, fetched_at, elapsed, truncated
+                 FROM snapshots
+                 WHERE url=? ORDER BY fetched_at DESC LIMIT 1''', (normalize_url(url),))
+    row = c.fetchone()
+    conn.close()
+    if not row:
+        return None
+    final_url, status, history, encoding, body_hash, fetched_at, elapsed, truncated = row
+    if max_age_hours is not None and time.time() - fetched_at > max_age_hours * 3600:
+        return None
+    try:
+        body = load_body(body_hash)
+    except (OSError, zlib.error):
+        return None
+    return {
+        'url': url,
+        'final_url': final_url,
+        'status': status,
+        'history': json.loads(history or '[]'),
+        'elapsed': elapsed,
+        'encoding': encoding,
+        'body': body,
+        'truncated': bool(truncated),
+        'body_hash': body_hash,
+        'fetched_at': fetched_at,
+    }
+
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def is_transient(page):
+    """True if page is a response that should not be stored or learned from."""
+    return isinstance(page, dict) and page.get('status') in TRANSIENT_STATUSES
+
+
+def get_page(url, fetch, max_age_hours=MAX_AGE_HOURS):
+    """Return a recent snapshot of url, downloading it with fetch(url) if needed.
+
+    Concurrent callers for the same URL wait for a single download; a failed
+    download raises in every waiting caller. max_age_hours=0 always
+    downloads. Responses with a TRANSIENT_STATUSES status are not saved.
+    """
+    page = latest(url, max_age_hours)
+    if page is not None:
+        return page
+    key = normalize_url(url)
+    with _inflight_lock:
+        flight = _inflight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _inflight[key] = {'done': threading.Event(), 'page': None, 'error': None}
+    if not leader:
+        flight['done'].wait()
+        if flight['error'] is not None:
+            raise flight['error']
+        return flight['page']
+    try:
+        page = fetch(url)
+        if not is_transient(page):
+            try:
+                save(page)
+            except Exception:
+                pass
+        flight['page'] = page
+        return page
+    except Exception as e:
+        flight['error'] = e
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        flight['done'].set()
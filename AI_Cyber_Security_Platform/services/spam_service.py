@@ -1,16 +1,24 @@
 import os
-import joblib
 from sklearn.exceptions import NotFittedError
+from .model_registry import ModelRegistry
 
 BASE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 MODEL_PATH = os.path.join(BASE, 'models', 'spam', 'spam_best_model.pkl')
 
-_spam_model = None
-if os.path.exists(MODEL_PATH):
-    try:
-        _spam_model = joblib.load(MODEL_PATH)
-    except Exception:
-        _spam_model = None
+
+def _warmup(model):
+    model.predict(['warmup message'])
+
+
+def _sample(model):
+    return ['Congratulations! You won a FREE prize, click here to claim',
+            'Are we still meeting for lunch tomorrow?',
+            'URGENT: call 09061701461 now to claim your cash reward',
+            '']
+
+
+_registry = ModelRegistry('spam', MODEL_PATH, warmup=_warmup, sample=_sample)
+_registry.load()
 
 def predict_spam(text: str) -> dict:
     """Return structured spam prediction: {label, score, reasons, raw}.
@@ -19,21 +27,24 @@ def predict_spam(text: str) -> dict:
     - score: float 0..1 when available (heuristic or model probability)
     - reasons: list of strings explaining heuristic triggers
     - raw: original input
+    - model_version: version of the model used (None for the rule-based path)
     """
+    model, version = _registry.active()
     # default empty result
-    res = {'label': 'unknown', 'score': None, 'reasons': [], 'raw': text}
+    res = {'label': 'unknown', 'score': None, 'reasons': [], 'raw': text, 'model_version': None}
 
     # If model present, try to use it
-    if _spam_model:
+    if model:
+        res['model_version'] = version
         try:
-            if hasattr(_spam_model, 'predict_proba'):
-                prob = _spam_model.predict_proba([text])
+            if hasattr(model, 'predict_proba'):
+                prob = model.predict_proba([text])
                 score = float(prob[0][1])
                 res['score'] = score
                 res['label'] = 'spam' if score >= 0.5 else 'not_spam'
                 return res
             else:
-                pred = _spam_model.predict([text])
+                pred = model.predict([text])
                 res['label'] = 'spam' if int(pred[0]) == 1 else 'not_spam'
                 res['score'] = 1.0 if res['label'] == 'spam' else 0.0
                 return res
@@ -45,6 +56,43 @@ def predict_spam(text: str) -> dict:
             pass
 
     # No usable model — use rule-based heuristic and return explanations
+    return _rule_based_result(text, res)
+
+
+def predict_spam_batch(texts) -> list:
+    """Return predict_spam() results for many texts, in input order.
+
+    The model is called once on the whole list; if it cannot score them, every
+    text gets the rule-based result.
+    """
+    texts = ['' if t is None else str(t) for t in texts]
+    model, version = _registry.active()
+    results = [{'label': 'unknown', 'score': None, 'reasons': [], 'raw': t, 'model_version': None}
+               for t in texts]
+    if model and texts:
+        try:
+            if hasattr(model, 'predict_proba'):
+                prob = model.predict_proba(texts)
+                for res, p in zip(results, prob):
+                    score = float(p[1])
+                    res['score'] = score
+                    res['label'] = 'spam' if score >= 0.5 else 'not_spam'
+                    res['model_version'] = version
+            else:
+                pred = model.predict(texts)
+                for res, p in zip(results, pred):
+                    res['label'] = 'spam' if int(p) == 1 else 'not_spam'
+                    res['score'] = 1.0 if res['label'] == 'spam' else 0.0
+                    res['model_version'] = version
+            return results
+        except Exception:
+            # NotFittedError and the rest: fall through to rule-based
+            pass
+    return [_rule_based_result(t, res) for t, res in zip(texts, results)]
+
+
+def _rule_based_result(text, res):
+    res['model_version'] = None
     is_spam = _rule_based_spam(text)
     # construct simple score and reasons
     reasons = []
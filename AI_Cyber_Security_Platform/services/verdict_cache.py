@@ -0,0 +1,117 @@
+"""In-process LRU + TTL cache of phishing URL verdicts.
+
+Entries are keyed on canonical_url(): lowercased scheme and host, default
+ports removed, an empty path written as '/' and tracking query parameters stripped, so trivially different
+spellings of the same link share one verdict. A hit skips feature extraction
+and inference entirely.
+"""
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlparse, urlsplit, urlunsplit
+
+MAXSIZE = int(os.environ.get('URL_VERDICT_CACHE_SIZE', 10000))
+TTL_SECONDS = float(os.environ.get('URL_VERDICT_CACHE_TTL', 3600))
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+TRACKING_PARAMS = frozenset((
+    'gclid', 'dclid', 'fbclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid',
+    '_ga', '_gl', '_hsenc', '_hsmi', 'mkt_tok',
+))
+TRACKING_PREFIXES = ('utm_',)
+
+
+def _is_tracking(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonical_url(url):
+    """Return the cache key for a URL (see module docstring)."""
+    url = (url or '').strip()
+    if not urlparse(url).scheme:
+        url = 'http://' + url
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '')
+    if ':' in host:
+        host = '[' + host + ']'
+    netloc = host
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        netloc += ':' + str(port)
+    if '@' in parts.netloc:
+        netloc = parts.netloc.rsplit('@', 1)[0] + '@' + netloc
+    query = parts.query
+    if query:
+        pairs = parse_qsl(query, keep_blank_values=True)
+        kept = [(k, v) for k, v in pairs if not _is_tracking(k)]
+        if len(kept) != len(pairs):
+            query = urlencode(kept)
+    path = parts.path or ('/' if scheme in DEFAULT_PORTS else '')
+    return urlunsplit((scheme, netloc, path, query, parts.fragment))
+
+
+class VerdictCache:
+    """Thread-safe LRU cache whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize=MAXSIZE, ttl=TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return a copy of the cached value, or None."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[1]
+        return copy.deepcopy(value)
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, predicate=None):
+        """Drop every entry (or those whose key matches predicate); return the count."""
+        with self._lock:
+            if predicate is None:
+                count = len(self._entries)
+                self._entries.clear()
+                return count
+            keys = [k for k in self._entries if predicate(k)]
+            for k in keys:
+                del self._entries[k]
+            return len(keys)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl_seconds': self.ttl,
+            }
@@ -0,0 +1,57 @@
+import sys
+from pathlib import Path
+# ensure repo root is on sys.path so `services` and `models` packages import correctly
+repo_root = str(Path(__file__).resolve().parents[1])
+if repo_root not in sys.path:
+	sys.path.insert(0, repo_root)
+
+from services import ensemble, phishing_url_service, phishing_website_service
+
+
+def _stub_website(monkeypatch, result):
+	calls = []
+	monkeypatch.setattr(phishing_website_service, 'fetch_context', lambda url: None)
+
+	def predict(url, context=None):
+		calls.append(url)
+		return result
+	monkeypatch.setattr(phishing_website_service, 'predict_phishing_website', predict)
+	return calls
+
+
+def test_cascade_without_url_model_runs_website_stage(monkeypatch):
+	# no URL model: stage 1 falls back to the uncalibrated heuristic, whose
+	# score alone must not decide the URL
+	monkeypatch.setattr(phishing_url_service._registry, 'active', lambda: (None, None))
+	calls = _stub_website(monkeypatch, 'Legitimate Website')
+
+	out = ensemble.ensemble_predict('https://www.google.com', mode='cascade')
+
+	assert out['url_pred']['model_version'] is None
+	assert calls == ['https://www.google.com']
+	assert out['stages'] == ['url_lexical', 'website']
+	assert out['site_pred'] == 'Legitimate Website'
+
+
+class _ProbaModel:
+	def __init__(self, p):
+		self.p = p
+
+	def predict(self, X):
+		return [int(self.p >= 0.5)] * len(X)
+
+	def predict_proba(self, X):
+		return [[1.0 - self.p, self.p] for _ in X]
+
+
+def test_cascade_stops_on_confident_model_score(monkeypatch):
+	monkeypatch.setattr(phishing_url_service._registry, 'active', lambda: (_ProbaModel(0.95), 'v1'))
+	calls = _stub_website(monkeypatch, 'Legitimate Website')
+
+	out = ensemble.ensemble_predict('http://paypal-login.example.net/verify', mode='cascade')
+
+	assert calls == []
+	assert out['stages'] == ['url_lexical']
+	assert out['combined'] == 'Phishing'
+	assert out['confidence'] == 1.0
+	assert out['cascade_score'] == 0.95
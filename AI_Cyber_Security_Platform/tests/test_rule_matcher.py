@@ -0,0 +1,29 @@
+import sys
+from pathlib import Path
+# ensure repo root is on sys.path so `services` and `models` packages import correctly
+repo_root = str(Path(__file__).resolve().parents[1])
+if repo_root not in sys.path:
+	sys.path.insert(0, repo_root)
+
+from models.phishing_website.feature_extraction import PAGE_RULES, URL_RULES, RuleMatcher
+
+
+def test_overlapping_url_rules_are_all_counted():
+	# '//user@' matches userinfo and contains the at_sign match
+	hits = URL_RULES.counts('http://user@evil.com/x.exe')
+	assert hits == {'at_sign': 1, 'userinfo': 1, 'ip_address': 0, 'executable_ext': 1}
+
+
+def test_rules_matching_at_the_same_position():
+	matcher = RuleMatcher((('short', r'ab'), ('long', r'abc'), ('inner', r'bc')))
+	assert matcher.counts('abc abc') == {'short': 2, 'long': 2, 'inner': 2}
+
+
+def test_stream_counts_match_whole_text():
+	text = ('<a href="/x%20y">q</a>' * 50 + '<script>window.open (u); eval(x)</script>') * 3
+	for chunk in (1, 7, 64, 1000):
+		stream = PAGE_RULES.stream(32)
+		for i in range(0, len(text), chunk):
+			stream.feed(text[i:i + chunk])
+		stream.close()
+		assert stream.hits == PAGE_RULES.counts(text)